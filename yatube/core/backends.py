@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from .sessions import PROCESS_LOCAL_CACHES
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который держит загруженного пользователя в кэше.
+
+    AuthenticationMiddleware вызывает ``get_user`` на каждом запросе,
+    поэтому без кэша каждый запрос вошедшего пользователя делает
+    SELECT в auth_user. Запись сбрасывается в ``core.signals``.
+
+    С кэшем в памяти процесса сброс виден только одному воркеру, и
+    остальные продолжали бы пускать деактивированного пользователя или
+    сессию со старым паролем — там пользователь всегда читается из базы.
+    """
+
+    def get_user(self, user_id):
+        if isinstance(caches[DEFAULT_CACHE_ALIAS], PROCESS_LOCAL_CACHES):
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
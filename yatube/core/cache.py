@@ -0,0 +1,50 @@
+"""Кэш страниц, который можно сбросить целиком по префиксу.
+
+``cache_page`` кладёт страницы под ключами с хэшем URL, поэтому точечно
+удалить, например, все страницы ленты с разными ``?page=`` нельзя.
+Здесь к префиксу добавляется номер версии из кэша: после
+``bump_cache_version(prefix)`` старые ключи больше не читаются и просто
+истекают по таймауту.
+"""
+from functools import wraps
+
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+
+def cache_version_key(key_prefix):
+    return f'cache_version:{key_prefix}'
+
+
+def get_cache_version(key_prefix):
+    return cache.get_or_set(cache_version_key(key_prefix), 1, None)
+
+
+def bump_cache_version(*key_prefixes):
+    """Сбрасывает все страницы, закэшированные под ``key_prefixes``."""
+    for key_prefix in key_prefixes:
+        key = cache_version_key(key_prefix)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def versioned_cache_page(timeout, key_prefix):
+    """Как ``cache_page``, но с версией префикса из кэша."""
+    def decorator(view_func):
+        cached_views = {}
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            version = get_cache_version(key_prefix)
+            cached_view = cached_views.get(version)
+            if cached_view is None:
+                cached_views.clear()
+                cached_view = cache_page(
+                    timeout, key_prefix=f'{key_prefix}.{version}'
+                )(view_func)
+                cached_views[version] = cached_view
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,93 @@
+import gzip
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+
+
+def gzip_compress(data, level=6):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def brotli_compress(data, level=5):
+    return brotli.compress(data, quality=level)
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks, level=5):
+    compressor = brotli.Compressor(quality=level)
+    for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Кодировки в порядке предпочтения:
+# расширение файла, функция сжатия и максимальный уровень.
+ENCODINGS = {}
+if brotli is not None:
+    ENCODINGS['br'] = ('.br', brotli_compress, 11)
+ENCODINGS['gzip'] = ('.gz', gzip_compress, 9)
+
+STREAM_ENCODERS = {
+    'br': brotli_stream,
+    'gzip': gzip_stream,
+}
+
+PRESERVE_WHITESPACE_RE = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2>)', re.IGNORECASE | re.DOTALL
+)
+INDENT_RE = re.compile(r'[ \t]*\n\s*')
+
+
+def is_compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(request_header):
+    """Кодировки из Accept-Encoding, которые мы умеем отдавать."""
+    accepted = set()
+    for part in request_header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00'):
+            continue
+        accepted.add(coding.strip().lower())
+    return [coding for coding in ENCODINGS if coding in accepted]
+
+
+def minify_html(html):
+    """Убирает отступы и пустые строки вне pre, textarea, script и style.
+
+    Любой пробельный промежуток с переводом строки сворачивается в один
+    перевод строки, поэтому отображение страницы не меняется.
+    """
+    parts = PRESERVE_WHITESPACE_RE.split(html)
+    # split возвращает: текст, блок, имя тега, текст, блок, имя тега, ...
+    result = []
+    for index in range(0, len(parts), 3):
+        result.append(INDENT_RE.sub('\n', parts[index]))
+        if index + 1 < len(parts):
+            result.append(parts[index + 1])
+    return ''.join(result)
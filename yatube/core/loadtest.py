@@ -0,0 +1,327 @@
+"""Нагрузочный прогон смешанного чтения и записи.
+
+WSGI-приложение из ``yatube/wsgi.py`` поднимается в локальном сервере:
+поток на запрос или процесс на запрос (``fork``), чтобы SQLite видела
+конкурентных писателей из разных соединений. Клиентские потоки от имени
+синтетических пользователей шлют смесь запросов — чтение лент, создание
+постов, комментарии, подписки и отписки — и собирают задержки по типам.
+
+Отчёт: пропускная способность, доля ошибок, число ``database is
+locked`` на стороне сервера и перцентили задержек. Сессии и CSRF-токены
+пользователей готовятся заранее, без логина через форму.
+"""
+import http.client
+import logging
+import math
+import multiprocessing
+import random
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from importlib import import_module
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.contrib.auth.hashers import make_password
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections
+from django.utils.crypto import get_random_string
+
+DEFAULT_MIX = 'feed=70,post=10,comment=15,follow=5'
+OPERATIONS = ('feed', 'post', 'comment', 'follow')
+PERCENTILES = (50, 90, 99)
+
+
+def parse_mix(mix):
+    """'feed=70,post=10' -> {'feed': 70, 'post': 10}."""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f'Неизвестная операция: {name}')
+        weights[name] = int(weight)
+    if not any(weights.values()):
+        raise ValueError('Все веса нулевые')
+    return weights
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = math.ceil(percent / 100 * len(sorted_values)) - 1
+    return sorted_values[max(index, 0)]
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class ForkingWSGIServer(socketserver.ForkingMixIn, WSGIServer):
+    request_queue_size = 1024
+
+    def process_request(self, request, client_address):
+        # Дочерний процесс не должен унаследовать открытые соединения.
+        connections.close_all()
+        super().process_request(request, client_address)
+
+
+SERVERS = {
+    'threads': ThreadingWSGIServer,
+    'processes': ForkingWSGIServer,
+}
+
+
+class LockCounter:
+    """Считает ``database is locked`` в необработанных исключениях views.
+
+    Счётчик в общей памяти, поэтому видит и дочерние процессы сервера.
+    """
+
+    def __init__(self):
+        self.value = multiprocessing.Value('i', 0)
+
+    def __call__(self, sender, **kwargs):
+        error = sys.exc_info()[1]
+        if isinstance(error, OperationalError) and 'locked' in str(error):
+            with self.value.get_lock():
+                self.value.value += 1
+
+
+def start_server(application, mode):
+    server = SERVERS[mode](('127.0.0.1', 0), QuietHandler)
+    server.set_app(application)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def create_users(count, chunk_size=1000):
+    """Создаёт синтетических пользователей и готовые сессии для них.
+
+    Возвращает список (id, имя, Cookie, CSRF-токен) по пользователям.
+    """
+    User = get_user_model()
+    prefix = get_random_string(6).lower()
+    password = make_password(None)
+    User.objects.bulk_create(
+        (
+            User(username=f'load_{prefix}_{i}', password=password)
+            for i in range(count)
+        ),
+        batch_size=chunk_size,
+    )
+    store_class = import_module(settings.SESSION_ENGINE).SessionStore
+    backend = settings.AUTHENTICATION_BACKENDS[0]
+    users = []
+    for user in User.objects.filter(username__startswith=f'load_{prefix}_'):
+        session = store_class()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = backend
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        csrf = get_random_string(32)
+        cookie = (
+            f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+            f'{settings.CSRF_COOKIE_NAME}={csrf}'
+        )
+        users.append((user.pk, user.username, cookie, csrf))
+    return users
+
+
+class LoadRun:
+    """Клиенты одного прогона и собранная ими статистика."""
+
+    def __init__(self, port, users, weights, seed=None):
+        self.port = port
+        self.users = users
+        self.operations = list(weights)
+        self.weights = [weights[name] for name in self.operations]
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.post_ids = []
+
+    def pick(self):
+        with self.lock:
+            operation = self.random.choices(
+                self.operations, self.weights
+            )[0]
+            user = self.random.choice(self.users)
+            other = self.random.choice(self.users)
+            post_id = (
+                self.random.choice(self.post_ids) if self.post_ids else None
+            )
+            roll = self.random.random()
+        return operation, user, other, post_id, roll
+
+    def request(self, method, path, user, data=None):
+        _, _, cookie, csrf = user
+        headers = {'Cookie': cookie}
+        body = None
+        if data is not None:
+            body = urlencode(dict(data, csrfmiddlewaretoken=csrf))
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection = http.client.HTTPConnection(
+            '127.0.0.1', self.port, timeout=30
+        )
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+    def plan(self, operation, other, post_id, roll):
+        """(метод, путь, данные) для операции."""
+        if operation == 'post':
+            return 'POST', '/create/', {'text': f'Нагрузка {roll:.6f}'}
+        if operation == 'comment' and post_id:
+            return 'POST', f'/posts/{post_id}/comment/', {'text': 'Ок'}
+        if operation == 'follow':
+            action = 'follow' if roll < 0.5 else 'unfollow'
+            return 'GET', f'/profile/{other[1]}/{action}/', None
+        if roll < 0.4:
+            return 'GET', '/', None
+        if roll < 0.6:
+            return 'GET', f'/profile/{other[1]}/', None
+        if roll < 0.8 and post_id:
+            return 'GET', f'/posts/{post_id}/', None
+        return 'GET', '/follow/', None
+
+    def perform(self):
+        operation, user, other, post_id, roll = self.pick()
+        if operation == 'comment' and not post_id:
+            operation = 'post'
+        method, path, data = self.plan(operation, other, post_id, roll)
+        started = time.perf_counter()
+        try:
+            status = self.request(method, path, user, data)
+        except (OSError, http.client.HTTPException) as error:
+            status = type(error).__name__
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+            self.statuses[operation][status] += 1
+        return operation, status
+
+    def worker(self, deadline, remaining):
+        while time.monotonic() < deadline:
+            with self.lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            self.perform()
+
+    def run(self, concurrency, duration, requests):
+        deadline = time.monotonic() + duration
+        remaining = [requests or math.inf]
+        threads = [
+            threading.Thread(target=self.worker, args=(deadline, remaining))
+            for _ in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def is_error(status):
+    return not isinstance(status, int) or status >= 400
+
+
+def report(run, elapsed, locked):
+    """Строки отчёта по прогону."""
+    total = sum(len(values) for values in run.latencies.values())
+    errors = sum(
+        count
+        for statuses in run.statuses.values()
+        for status, count in statuses.items()
+        if is_error(status)
+    )
+    lines = [
+        f'Запросов: {total} за {elapsed:.1f} с, '
+        f'{total / elapsed if elapsed else 0:.1f} запр./с',
+        f'Ошибок: {errors} ({errors / total if total else 0:.1%}), '
+        f'database is locked: {locked}',
+        f'{"операция":<10} {"запросов":>9} {"ошибок":>7} '
+        + ' '.join(f'{f"p{p}, мс":>9}' for p in PERCENTILES)
+        + f' {"max, мс":>9}',
+    ]
+    for operation in OPERATIONS:
+        values = sorted(run.latencies.get(operation, ()))
+        if not values:
+            continue
+        statuses = run.statuses[operation]
+        failed = sum(
+            count for status, count in statuses.items() if is_error(status)
+        )
+        lines.append(
+            f'{operation:<10} {len(values):>9} {failed:>7} '
+            + ' '.join(
+                f'{percentile(values, p) * 1000:>9.1f}' for p in PERCENTILES
+            )
+            + f' {values[-1] * 1000:>9.1f}'
+        )
+        lines.append(
+            ' ' * 11 + 'статусы: ' + ', '.join(
+                f'{status}: {count}'
+                for status, count in sorted(
+                    statuses.items(), key=lambda item: str(item[0])
+                )
+            )
+        )
+    return lines
+
+
+def run_load(users=1000, concurrency=16, duration=30, requests=None,
+             mix=DEFAULT_MIX, mode='threads', seed=None, seed_posts=100):
+    """Готовит данные, запускает сервер и клиентов, возвращает отчёт.
+
+    Работает с текущей базой ``default``: вызывающий код отвечает за то,
+    чтобы это была временная база.
+    """
+    from posts.models import Post
+    from yatube.wsgi import application
+
+    weights = parse_mix(mix)
+    synthetic = create_users(users)
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author_id=synthetic[i % users][0])
+        for i in range(seed_posts)
+    )
+    locked = LockCounter()
+    got_request_exception.connect(locked, dispatch_uid='loadtest')
+    # Трейсбеки сотен ошибок 500 утопили бы отчёт: они уже посчитаны.
+    request_logger = logging.getLogger('django.request')
+    request_logger.disabled = True
+    # Перед запуском сервера: дочерние процессы не делят соединения.
+    connections.close_all()
+    server = start_server(application, mode)
+    try:
+        run = LoadRun(server.server_address[1], synthetic, weights, seed)
+        run.post_ids = list(Post.objects.values_list('pk', flat=True))
+        elapsed = run.run(concurrency, duration, requests)
+    finally:
+        server.shutdown()
+        server.server_close()
+        got_request_exception.disconnect(dispatch_uid='loadtest')
+        request_logger.disabled = False
+    return report(run, elapsed, locked.value.value)
@@ -0,0 +1,167 @@
+"""Очередь исходящих писем в базе.
+
+``OutboxEmailBackend`` подключается как ``EMAIL_BACKEND``: любое
+``send_mail``/``EmailMessage.send()`` (сброс пароля, дайджест и т. п.)
+только сохраняет письмо в ``OutgoingEmail`` и сразу возвращается.
+Команда ``send_queued_mail`` пачками отправляет очередь через
+``OUTBOX_DELIVERY_BACKEND`` и повторяет неудачные попытки с
+экспоненциальной задержкой.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def serialize_attachment(attachment):
+    """Вложение (имя, содержимое, тип) в JSON; bytes — в base64.
+
+    Готовые MIMEBase-части не поддерживаются: их не восстановить без
+    потерь, поэтому такое письмо лучше не принять, чем отправить другим.
+    """
+    if not isinstance(attachment, tuple):
+        raise ValueError('Вложения MIMEBase в очередь не принимаются')
+    filename, content, mimetype = attachment
+    if isinstance(content, bytes):
+        return [filename, base64.b64encode(content).decode(), mimetype, True]
+    return [filename, content, mimetype, False]
+
+
+def deserialize_attachment(item):
+    filename, content, mimetype, is_binary = item
+    if is_binary:
+        content = base64.b64decode(content)
+    return filename, content, mimetype
+
+
+def serialize_message(message):
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': [
+            serialize_attachment(item) for item in message.attachments
+        ],
+        'content_subtype': message.content_subtype,
+        'mixed_subtype': message.mixed_subtype,
+    })
+
+
+def deserialize_message(payload, connection):
+    data = json.loads(payload)
+    alternatives = [tuple(item) for item in data.pop('alternatives')]
+    attachments = [
+        deserialize_attachment(item) for item in data.pop('attachments', [])
+    ]
+    content_subtype = data.pop('content_subtype', 'plain')
+    mixed_subtype = data.pop('mixed_subtype', 'mixed')
+    message = EmailMultiAlternatives(
+        alternatives=alternatives,
+        attachments=attachments,
+        connection=connection,
+        **data
+    )
+    message.content_subtype = content_subtype
+    message.mixed_subtype = mixed_subtype
+    return message
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        queued = OutgoingEmail.objects.bulk_create([
+            OutgoingEmail(
+                subject=message.subject[:255],
+                recipients=', '.join(message.recipients()),
+                payload=serialize_message(message),
+                next_attempt_at=now,
+            )
+            for message in email_messages
+            if message.recipients()
+        ])
+        return len(queued)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY,
+    ))
+
+
+def claim_batch(batch_size):
+    """Забирает пачку готовых к отправке писем.
+
+    Письма переводятся в SENDING условным UPDATE с арендой до
+    ``lease_until``, поэтому два воркера не возьмут одно письмо дважды,
+    а письма упавшего воркера после окончания аренды заберёт другой.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT)
+    ready = OutgoingEmail.objects.filter(
+        status__in=(OutgoingEmail.PENDING, OutgoingEmail.SENDING),
+        next_attempt_at__lte=now,
+    )
+    with transaction.atomic():
+        ids = list(
+            ready.order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        ready.filter(id__in=ids).update(
+            status=OutgoingEmail.SENDING,
+            next_attempt_at=lease_until,
+        )
+    return list(
+        OutgoingEmail.objects.filter(
+            id__in=ids,
+            status=OutgoingEmail.SENDING,
+            next_attempt_at=lease_until,
+        )
+    )
+
+
+def deliver_batch(batch_size=None):
+    """Отправляет одну пачку. Возвращает (отправлено, неудачно)."""
+    batch = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+    with connection:
+        for email in batch:
+            email.attempts += 1
+            try:
+                deserialize_message(email.payload, connection).send()
+            except Exception as error:
+                failed += 1
+                email.last_error = f'{type(error).__name__}: {error}'
+                if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    email.status = OutgoingEmail.FAILED
+                else:
+                    email.status = OutgoingEmail.PENDING
+                    email.next_attempt_at = (
+                        timezone.now() + retry_delay(email.attempts)
+                    )
+            else:
+                sent += 1
+                email.status = OutgoingEmail.SENT
+                email.sent_at = timezone.now()
+            email.save(update_fields=(
+                'attempts', 'status', 'last_error', 'next_attempt_at',
+                'sent_at',
+            ))
+    return sent, failed
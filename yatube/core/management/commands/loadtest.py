@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from core.loadtest import DEFAULT_MIX, SERVERS, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон wsgi-приложения на временной базе: смесь '
+        'чтения лент, постов, комментариев и подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Число клиентских потоков.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность прогона в секундах.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=None,
+            help='Остановиться после стольких запросов.',
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса операций feed, post, comment и follow.',
+        )
+        parser.add_argument(
+            '--server', choices=sorted(SERVERS), default='threads',
+            help='Поток или процесс на запрос.',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--ratelimit', action='store_true',
+            help='Не отключать ограничение частоты запросов.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('Прогон рассчитан на SQLite.')
+        directory = tempfile.mkdtemp(prefix='yatube-load-')
+        connection.settings_dict['TEST'] = dict(
+            connection.settings_dict.get('TEST') or {},
+            NAME=os.path.join(directory, 'load.sqlite3'),
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # Остальные базы (шарды) тоже уводим во временный каталог, чтобы
+        # случайное соединение не создало файл рядом с настоящими.
+        other_names = {}
+        for alias in connections:
+            other = connections[alias]
+            if alias != 'default' and other.vendor == 'sqlite':
+                other_names[alias] = other.settings_dict['NAME']
+                other.settings_dict['NAME'] = os.path.join(
+                    directory, f'{alias}.sqlite3'
+                )
+        try:
+            with override_settings(
+                RATELIMIT_ENABLE=options['ratelimit'],
+                WARMUP_ON_STARTUP=False,
+            ):
+                lines = run_load(
+                    users=options['users'],
+                    concurrency=options['concurrency'],
+                    duration=options['duration'],
+                    requests=options['requests'],
+                    mix=options['mix'],
+                    mode=options['server'],
+                    seed=options['seed'],
+                )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            for alias, name in other_names.items():
+                connections[alias].close()
+                connections[alias].settings_dict['NAME'] = name
+            shutil.rmtree(directory, ignore_errors=True)
+        for line in lines:
+            self.stdout.write(line)
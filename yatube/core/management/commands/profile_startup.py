@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# -X importtime видит только импорты через оператор import, а Django
+# загружает приложения через importlib.import_module. Подменяем её на
+# __import__, чтобы такие модули тоже попали в отчёт.
+BOOTSTRAP = '''
+import importlib, importlib.util, sys
+def import_module(name, package=None):
+    if name.startswith('.'):
+        name = importlib.util.resolve_name(name, package)
+    __import__(name)
+    return sys.modules[name]
+importlib.import_module = import_module
+'''
+
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': 'import yatube.wsgi',
+    'urls': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+}
+
+
+def parse_importtime(output):
+    """Разбирает вывод ``python -X importtime``.
+
+    Возвращает список (собственное время, суммарное время, модуль)
+    в микросекундах.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько стоит импорт каждого модуля при старте.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=sorted(TARGETS), default='wsgi',
+            help='Что загружать: django.setup(), wsgi.py или URLconf.',
+        )
+        parser.add_argument(
+            '--sort', choices=('self', 'cumulative'), default='self',
+        )
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument(
+            '--prefix', default='',
+            help='Показывать только модули с этим префиксом.',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             BOOTSTRAP + TARGETS[options['target']]],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        elapsed = time.perf_counter() - started
+        modules = [
+            module for module in parse_importtime(result.stderr)
+            if module[2].startswith(options['prefix'])
+        ]
+        column = 0 if options['sort'] == 'self' else 1
+        modules.sort(key=lambda module: module[column], reverse=True)
+
+        self.stdout.write(f'{"self, ms":>10} {"total, ms":>10}  модуль')
+        for self_us, cumulative_us, name in modules[:options['limit']]:
+            self.stdout.write(
+                f'{self_us / 1000:>10.1f} '
+                f'{cumulative_us / 1000:>10.1f}  {name}'
+            )
+        self.stdout.write(
+            f'Импортировано модулей: {len(modules)}, '
+            f'суммарно {sum(m[0] for m in modules) / 1000:.1f} мс, '
+            f'процесс целиком {elapsed * 1000:.0f} мс'
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr.splitlines()[-1])
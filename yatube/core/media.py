@@ -0,0 +1,173 @@
+"""Раздача загруженных файлов из MEDIA_ROOT.
+
+Проверки доступа выполняются в Python, а саму передачу можно отдать:
+
+* ``python`` — ``FileResponse``; WSGI-сервер с ``wsgi.file_wrapper``
+  (gunicorn) передаёт файл через ``os.sendfile`` без копирования;
+* ``x-accel`` — заголовок ``X-Accel-Redirect`` для nginx;
+* ``x-sendfile`` — заголовок ``X-Sendfile`` для Apache/lighttpd.
+
+Режим задаётся настройкой ``MEDIA_SERVE_MODE``. Скрытые файлы не
+отдаются никогда; для остальных действует правило из
+``MEDIA_ACCESS_RULES`` — функция ``(request, name) -> bool`` для первого
+подходящего префикса пути. Файлы без правила отдаются всем с
+``MEDIA_CACHE_CONTROL``, а файлы под правилом — с
+``MEDIA_PRIVATE_CACHE_CONTROL``: общий кэш не должен отдавать их после
+того, как доступ закрыт.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.module_loading import import_string
+from django.utils.http import http_date, parse_http_date_safe
+
+from .utils import file_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого можно прочитать не больше ``length`` байт.
+
+    ``fileno`` и ``tell`` проксируются, поэтому gunicorn по-прежнему
+    отправляет диапазон через ``os.sendfile`` с текущей позиции.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Разбирает один диапазон из Range.
+
+    Возвращает (начало, конец включительно), None — если заголовок надо
+    проигнорировать, и ValueError — если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def access_rule(name):
+    """Правило из MEDIA_ACCESS_RULES для файла ``name`` или None."""
+    for prefix, rule in settings.MEDIA_ACCESS_RULES.items():
+        if name.startswith(prefix):
+            return import_string(rule)
+    return None
+
+
+def has_access(request, name):
+    """Разрешено ли отдавать файл ``name`` из MEDIA_ROOT."""
+    name = posixpath.normpath(name)
+    if any(part.startswith('.') for part in name.split('/')):
+        return False
+    rule = access_rule(name)
+    return rule is None or rule(request, name)
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(','))
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return since is not None and int(mtime) <= since
+
+
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not has_access(request, path) or not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            settings.MEDIA_CACHE_CONTROL
+            if access_rule(posixpath.normpath(path)) is None
+            else settings.MEDIA_PRIVATE_CACHE_CONTROL
+        ),
+    }
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponse(status=304)
+    elif settings.MEDIA_SERVE_MODE == 'x-accel':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+    elif settings.MEDIA_SERVE_MODE == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+    else:
+        response = file_response(request, full_path, stat.st_size, etag)
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    if response.status_code != 304:
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def file_response(request, full_path, size, etag):
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+        response['Content-Length'] = size
+        return response
+
+    start, end = byte_range
+    response = FileResponse(RangeFile(file, start, end - start + 1))
+    response.status_code = 206
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
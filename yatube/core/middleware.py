@@ -0,0 +1,132 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+from .compression import (
+    ENCODINGS, STREAM_ENCODERS, accepted_encodings, is_compressible,
+    minify_html
+)
+from .profiling import profile_request, requested, save_profile
+
+
+class CompressionMiddleware:
+    """Сжимает ответы в br или gzip, включая потоковые.
+
+    Обычные ответы короче ``COMPRESSION_MIN_SIZE`` не трогаются, HTML
+    перед сжатием по желанию минифицируется. HTML с CSRF-токеном не
+    сжимается вовсе: по длине сжатого ответа токен можно подобрать
+    (BREACH). Сжатые байты общих для всех ответов — анонимных или
+    ``Cache-Control: public`` — кладутся в отдельный кэш
+    ``COMPRESSION_CACHE`` по хешу исходного тела: страницы из
+    ``cache_page`` приходят каждый раз одинаковыми и после первого
+    запроса не пережимаются. Персональные страницы не повторяются,
+    их в кэш не кладём.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '')
+        if (
+            response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not is_compressible(content_type)
+        ):
+            return response
+        if content_type.startswith('text/html') and request.META.get(
+            'CSRF_COOKIE_USED'
+        ):
+            return response
+
+        if not response.streaming and content_type.startswith('text/html'):
+            self.minify(response)
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codings = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if not codings:
+            return response
+        coding = codings[0]
+        level = settings.COMPRESSION_LEVELS[coding]
+
+        if response.streaming:
+            response.streaming_content = STREAM_ENCODERS[coding](
+                response.streaming_content, level
+            )
+            del response['Content-Length']
+        else:
+            compressed = self.compress(
+                response.content, coding, level,
+                self.is_shared(request, response),
+            )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
+
+    def minify(self, response):
+        if settings.COMPRESSION_MINIFY_HTML:
+            response.content = minify_html(
+                response.content.decode(response.charset)
+            ).encode(response.charset)
+            response['Content-Length'] = str(len(response.content))
+
+    def is_shared(self, request, response):
+        """Одинаков ли ответ для разных пользователей."""
+        if 'public' in response.get('Cache-Control', ''):
+            return True
+        if response.cookies:
+            return False
+        user = getattr(request, 'user', None)
+        return user is None or not user.is_authenticated
+
+    def compress(self, content, coding, level, shared):
+        timeout = settings.COMPRESSION_CACHE_TIMEOUT
+        if not timeout or not shared:
+            return ENCODINGS[coding][1](content, level)
+        cache = caches[settings.COMPRESSION_CACHE]
+        digest = hashlib.sha1(content).hexdigest()
+        key = f'compressed:{coding}:{level}:{digest}'
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = ENCODINGS[coding][1](content, level)
+            cache.set(key, compressed, timeout)
+        return compressed
+
+
+class ProfilingMiddleware:
+    """Профилирует отдельные запросы, см. ``core.profiling``.
+
+    Стоит первым, чтобы в профиль попали и остальные middleware. Если
+    профиль запрошен токеном, его имя возвращается в ``X-Profile-Id``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = requested(request)
+        if reason is None:
+            return self.get_response(request)
+        response, profile = profile_request(
+            self.get_response, request, reason
+        )
+        name = save_profile(profile)
+        if reason == 'token':
+            response['X-Profile-Id'] = name
+        return response
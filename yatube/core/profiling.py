@@ -0,0 +1,260 @@
+"""Выборочное профилирование запросов семплированием стеков.
+
+Запрос профилируется, если в заголовке ``X-Profile`` или параметре
+``profile`` пришёл подписанный токен со страницы профилей, либо он попал
+в случайную долю ``PROFILE_SAMPLE_RATE``. Пока запрос выполняется,
+отдельный поток раз в ``PROFILE_INTERVAL`` секунд снимает стек потока
+запроса через ``sys._current_frames()``: сам запрос не трассируется,
+поэтому накладные расходы почти не зависят от глубины вызовов. Стек
+обрезается по кадру middleware, а на время SQL-запроса к нему
+добавляется синтетический кадр с текстом запроса.
+
+Результат — свёрнутые стеки (collapsed, как у flamegraph.pl) с
+метаданными — пишется файлом в ``PROFILE_ROOT``; хранится не больше
+``PROFILE_MAX_COUNT`` последних профилей. Потоковые ответы профилируются
+до начала отдачи тела.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connections
+
+TOKEN_SALT = 'core.profiling'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+PROFILE_NAME_RE = re.compile(r'^[0-9]+-[0-9a-f]{32}$')
+SQL_LABEL_LENGTH = 80
+
+
+def make_token(user):
+    """Токен, включающий профилирование запроса, на PROFILE_TOKEN_AGE."""
+    return signing.dumps({'user': user.pk}, salt=TOKEN_SALT)
+
+
+def token_is_valid(token):
+    """Токен подписан и выдан тому, кто и сейчас активный сотрудник."""
+    try:
+        data = signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.PROFILE_TOKEN_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return get_user_model().objects.filter(
+        pk=data.get('user'), is_staff=True, is_active=True
+    ).exists()
+
+
+def requested(request):
+    """Причина профилировать запрос: 'token', 'sample' или None."""
+    token = (
+        request.META.get(PROFILE_HEADER)
+        or request.GET.get(PROFILE_PARAM)
+    )
+    if token and token_is_valid(token):
+        return 'token'
+    if random.random() < settings.PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{code.co_name}'
+
+
+def sql_label(sql):
+    sql = ' '.join(sql.replace(';', ' ').split())
+    return f'[sql] {sql[:SQL_LABEL_LENGTH]}'
+
+
+class Sampler:
+    """Снимает стеки одного потока, пока запущен.
+
+    ``root`` — кадр, выше которого стек не поднимается (вызов
+    middleware): кадры сервера и обработчика WSGI в профиль не попадают.
+    """
+
+    def __init__(self, thread_id, root, interval):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.query = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and frame is not self.root:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        # Поток запроса уже ждёт остановки семплера внутри stop().
+        if not stack or self.stopped.is_set():
+            return
+        stack.reverse()
+        query = self.query
+        if query is not None:
+            stack.append(sql_label(query))
+        self.stacks[';'.join(stack)] += 1
+        self.samples += 1
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        self.query = sql
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query = None
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started
+
+
+def profile_request(get_response, request, reason):
+    """Выполняет запрос под семплером, возвращает (ответ, профиль)."""
+    sampler = Sampler(
+        threading.get_ident(), sys._getframe(), settings.PROFILE_INTERVAL
+    )
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(sampler.execute_wrapper)
+                )
+            response = get_response(request)
+    finally:
+        sampler.stop()
+    duration = time.perf_counter() - started
+    match = getattr(request, 'resolver_match', None)
+    profile = {
+        'view': match.view_name if match else '',
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'reason': reason,
+        'started': time.time() - duration,
+        'duration': duration,
+        'interval': sampler.interval,
+        'samples': sampler.samples,
+        'queries': sampler.queries,
+        'sql_time': sampler.sql_time,
+        'stacks': dict(sampler.stacks),
+    }
+    return response, profile
+
+
+def save_profile(profile, root=None):
+    """Пишет профиль в хранилище и удаляет самые старые сверх лимита.
+
+    Возвращает имя профиля.
+    """
+    root = root or settings.PROFILE_ROOT
+    os.makedirs(root, exist_ok=True)
+    name = f'{time.time_ns()}-{uuid.uuid4().hex}'
+    temporary = os.path.join(root, f'.{name}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(profile, file, ensure_ascii=False)
+    os.replace(temporary, os.path.join(root, f'{name}.json'))
+    for old in profile_names(root)[settings.PROFILE_MAX_COUNT:]:
+        try:
+            os.remove(os.path.join(root, f'{old}.json'))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def profile_names(root=None):
+    """Имена профилей в хранилище, новые первыми."""
+    root = root or settings.PROFILE_ROOT
+    try:
+        files = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    names = [
+        file[:-len('.json')] for file in files
+        if file.endswith('.json')
+        and PROFILE_NAME_RE.match(file[:-len('.json')])
+    ]
+    return sorted(names, key=lambda name: int(name.split('-')[0]),
+                  reverse=True)
+
+
+def load_profile(name, root=None):
+    """Профиль по имени или None, если его нет (или уже вытеснен)."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    root = root or settings.PROFILE_ROOT
+    try:
+        with open(os.path.join(root, f'{name}.json'),
+                  encoding='utf-8') as file:
+            profile = json.load(file)
+    except FileNotFoundError:
+        return None
+    profile['name'] = name
+    return profile
+
+
+def collapsed(profile):
+    """Текст в формате свёрнутых стеков: 'кадр;кадр;кадр число'."""
+    return ''.join(
+        f'{stack} {count}\n'
+        for stack, count in sorted(profile['stacks'].items())
+    )
+
+
+def speedscope(profile):
+    """Профиль в формате speedscope (sampled, веса в миллисекундах)."""
+    frames = {}
+    samples = []
+    weights = []
+    interval = profile['interval'] * 1000
+    for stack, count in profile['stacks'].items():
+        samples.append([
+            frames.setdefault(label, len(frames))
+            for label in stack.split(';')
+        ])
+        weights.append(count * interval)
+    title = f'{profile["method"]} {profile["path"]}'
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': title,
+        'exporter': 'yatube',
+        'shared': {'frames': [{'name': label} for label in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': title,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
@@ -0,0 +1,88 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .views import too_many_requests
+
+RATE_PERIODS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+}
+
+
+def parse_rate(rate):
+    """Разбирает строку вида '10/m' в пару (ёмкость, период в секундах)."""
+    count, _, period = rate.partition('/')
+    return int(count), RATE_PERIODS[period[:1] or 's']
+
+
+def get_client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_keys(request, scope):
+    """Ключи корзин: одна на IP и одна на пользователя, если он вошёл."""
+    keys = [f'ratelimit:{scope}:ip:{get_client_ip(request)}']
+    if request.user.is_authenticated:
+        keys.append(f'ratelimit:{scope}:user:{request.user.pk}')
+    return keys
+
+
+def consume(keys, rate, now=None):
+    """Забирает по жетону из каждой корзины.
+
+    Возвращает 0, если запрос пропущен, иначе число секунд до появления
+    свободного жетона. Состояние корзины — пара (жетоны, время),
+    так что проверка стоит одно чтение и одну запись в кэш.
+    """
+    capacity, period = parse_rate(rate)
+    refill = capacity / period
+    now = time.time() if now is None else now
+    cache = caches[settings.RATELIMIT_CACHE]
+
+    buckets = cache.get_many(keys)
+    retry_after = 0
+    for key in keys:
+        tokens, updated = buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            retry_after = max(retry_after, (1 - tokens) / refill)
+        buckets[key] = (tokens, now)
+
+    if not retry_after:
+        buckets = {
+            key: (tokens - 1, updated)
+            for key, (tokens, updated) in buckets.items()
+        }
+    cache.set_many(buckets, timeout=period)
+    return math.ceil(retry_after)
+
+
+def ratelimit(scope, rate=None, methods=None):
+    """Ограничивает частоту вызовов view корзиной жетонов.
+
+    Лимит берётся из ``settings.RATELIMITS[scope]``, а если его там нет —
+    из аргумента ``rate``. При превышении отдаётся 429 с Retry-After.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            current_rate = settings.RATELIMITS.get(scope, rate)
+            if (
+                settings.RATELIMIT_ENABLE
+                and current_rate
+                and (methods is None or request.method in methods)
+            ):
+                retry_after = consume(
+                    bucket_keys(request, scope), current_rate
+                )
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
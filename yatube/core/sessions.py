@@ -0,0 +1,53 @@
+"""Сессии в кэше с отложенной записью в базу.
+
+Подключается через ``SESSION_ENGINE = 'core.sessions'``. Чтение идёт из
+кэша, а в базу изменения сессии пишутся не чаще одного раза за
+``SESSION_WRITE_BEHIND_INTERVAL`` секунд. Создание и удаление сессии
+(вход, смена ключа и выход) по-прежнему сразу попадают в базу.
+
+Несохранённые в базу изменения живут только в кэше, поэтому отложенная
+запись включается лишь с общим для воркеров кэшем (memcached, redis).
+С кэшем в памяти процесса его вытеснение или перезапуск теряли бы
+данные — там каждое сохранение пишется в базу, как в ``cached_db``.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import (
+    SessionStore as CachedDBStore
+)
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'core.sessions'
+
+    @property
+    def synced_key(self):
+        return f'{self.cache_key}:synced'
+
+    def _db_write_due(self):
+        """Возвращает True, если с последней записи в базу прошёл интервал."""
+        if (
+            not settings.SESSION_WRITE_BEHIND_INTERVAL
+            or isinstance(self._cache, PROCESS_LOCAL_CACHES)
+        ):
+            return True
+        return self._cache.add(
+            self.synced_key, True, settings.SESSION_WRITE_BEHIND_INTERVAL
+        )
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None or self._db_write_due():
+            super().save(must_create)
+            return
+        self._cache.set(
+            self.cache_key, self._get_session(), self.get_expiry_age()
+        )
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        super().delete(session_key)
+        if session_key is not None:
+            self._cache.delete(f'{self.cache_key_prefix}{session_key}:synced')
@@ -0,0 +1,145 @@
+"""Статика с хешами в именах, предсжатыми копиями и WSGI-раздачей.
+
+``CompressedManifestStaticFilesStorage`` при collectstatic добавляет
+хеш содержимого в имена файлов и рядом с каждым сжимаемым файлом кладёт
+варианты ``.gz`` и ``.br``. ``StaticFilesApp`` раздаёт эти файлы прямо
+из WSGI-процесса, когда перед приложением нет nginx.
+"""
+import mimetypes
+import os
+from email.utils import formatdate
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+from .compression import ENCODINGS, accepted_encodings, is_compressible
+from .utils import file_etag
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+
+def iter_file(file, chunk_size=64 * 1024):
+    with file:
+        yield from iter(lambda: file.read(chunk_size), b'')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        # Пока collectstatic не запускали, отдаём исходное имя, а не 500.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+        for hashed_name in self.hashed_files.values():
+            self.compress(hashed_name)
+
+    def compress(self, name):
+        content_type, _ = mimetypes.guess_type(name)
+        if not is_compressible(content_type):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < settings.STATIC_COMPRESS_MIN_SIZE:
+            return
+        for suffix, compress, best_level in ENCODINGS.values():
+            compressed = compress(data, best_level)
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+
+
+class StaticFilesApp:
+    """WSGI-обёртка, отдающая STATIC_ROOT мимо Django.
+
+    Файлы с хешем в имени получают ``immutable`` на год, остальные —
+    короткий кэш. Если клиент принимает br или gzip и рядом лежит
+    предсжатая копия, отдаётся она.
+    """
+
+    def __init__(self, application, root=None, prefix=None,
+                 strip_prefix=True):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        # Без strip_prefix имя файла — весь путь: так /sitemap.xml
+        # отдаётся из корня с prefix='/sitemap'.
+        self.strip_prefix = strip_prefix
+        self._hashed_names = None
+
+    @property
+    def hashed_names(self):
+        if self._hashed_names is None:
+            manifest = getattr(staticfiles_storage, 'hashed_files', {})
+            self._hashed_names = set(manifest.values())
+        return self._hashed_names
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if (
+            environ.get('REQUEST_METHOD') in ('GET', 'HEAD')
+            and path.startswith(self.prefix)
+        ):
+            name = (
+                path[len(self.prefix):] if self.strip_prefix
+                else path.lstrip('/')
+            )
+            response = self.serve(environ, name)
+            if response is not None:
+                status, headers, body = response
+                start_response(status, headers)
+                return body
+        return self.application(environ, start_response)
+
+    def find_file(self, name, environ):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None, None
+        if not os.path.isfile(path):
+            return None, None
+        for coding in accepted_encodings(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        ):
+            suffix = ENCODINGS[coding][0]
+            if os.path.isfile(path + suffix):
+                return path + suffix, coding
+        return path, None
+
+    def serve(self, environ, name):
+        path, coding = self.find_file(name, environ)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        etag = file_etag(stat)
+        content_type, _ = mimetypes.guess_type(name)
+        headers = [
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL
+             if name in self.hashed_names else DEFAULT_CACHE_CONTROL),
+            ('ETag', etag),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            return '304 Not Modified', headers, []
+        headers += [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Content-Length', str(stat.st_size)),
+        ]
+        if coding:
+            headers.append(('Content-Encoding', coding))
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return '200 OK', headers, []
+        file_wrapper = environ.get('wsgi.file_wrapper', iter_file)
+        return '200 OK', headers, file_wrapper(open(path, 'rb'))
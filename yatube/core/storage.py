@@ -0,0 +1,64 @@
+"""Хранилище загрузок с адресацией по содержимому.
+
+Файл при сохранении потоком копируется во временный и одновременно
+хэшируется, а затем кладётся под именем
+``<каталог>/<первые 2 символа>/<sha256><расширение>``. Одинаковые загрузки
+получают одно имя, поэтому на диске лежит одна копия, а миниатюры
+sorl-thumbnail, которые привязаны к имени исходника, тоже общие.
+
+Ссылки на файл считаются по индексированному полю модели — см.
+``posts.deletion.release_image``. При повторной загрузке у существующего
+файла обновляется mtime, чтобы сборщик мусора с его «периодом
+охлаждения» не удалил файл, на который вот-вот сошлётся новый пост.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно определяется содержимым в _save.
+        return name
+
+    def content_name(self, name, digest):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(prefix='.upload-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            name = self.content_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.utime(full_path)
+                return name
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(temp_path, full_path)
+            temp_path = None
+            # mkstemp создаёт файл с правами 0600.
+            os.chmod(full_path, self.file_permissions_mode or 0o644)
+            return name
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,84 @@
+import gzip
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..compression import minify_html
+from ..middleware import CompressionMiddleware
+
+HTML = '<div>\n    <p>Текст</p>\n\n    <pre>  a\n    b</pre>\n</div>\n' * 50
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_CACHE_TIMEOUT=60)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['compression'].clear()
+        self.request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+    def process(self, response, request=None):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request or self.request)
+
+    def test_minify_keeps_preformatted_text(self):
+        """Минификация не трогает содержимое pre."""
+        self.assertEqual(
+            minify_html('<div>\n    <p>x</p>\n  <pre>  a\n    b</pre>\n'),
+            '<div>\n<p>x</p>\n<pre>  a\n    b</pre>\n'
+        )
+
+    def test_html_is_minified_and_gzipped(self):
+        """HTML минифицируется и сжимается."""
+        response = self.process(HttpResponse(HTML))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(response.content).decode(), minify_html(HTML)
+        )
+
+    def test_short_and_unaccepted_responses_are_left_alone(self):
+        """Короткие ответы и клиенты без gzip получают исходное тело."""
+        response = self.process(HttpResponse('<p>x</p>'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.process(
+            HttpResponse(HTML), RequestFactory().get('/')
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed(self):
+        """Потоковые ответы сжимаются по кускам."""
+        response = self.process(
+            StreamingHttpResponse(chunk.encode() for chunk in [HTML] * 3)
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body).decode(), HTML * 3)
+
+    def test_compressed_body_is_served_from_cache(self):
+        """Одинаковое тело второй раз не пережимается."""
+        first = self.process(HttpResponse(HTML)).content
+        with mock.patch('core.compression.gzip.compress') as compress:
+            second = self.process(HttpResponse(HTML)).content
+        compress.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_personal_bodies_are_not_cached(self):
+        """Ответы вошедшим пользователям в кэш не попадают."""
+        self.request.user = mock.Mock(is_authenticated=True)
+        self.process(HttpResponse(HTML))
+        self.request.user = AnonymousUser()
+        with mock.patch('core.compression.gzip.compress') as compress:
+            compress.return_value = b'gz'
+            self.process(HttpResponse(HTML))
+        compress.assert_called_once()
+
+    def test_html_with_csrf_token_is_not_compressed(self):
+        """HTML с CSRF-токеном не сжимается (BREACH)."""
+        self.request.META['CSRF_COOKIE_USED'] = True
+        response = self.process(HttpResponse(HTML))
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..loadtest import LoadRun, parse_mix, percentile, report
+
+
+class LoadTestTests(SimpleTestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix('feed=3, post=1'), {'feed': 3, 'post': 1}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix('feed=1,delete=1')
+
+    def test_report_counts_errors_and_percentiles(self):
+        run = LoadRun(0, [], {'feed': 1})
+        run.latencies['feed'] = [i / 1000 for i in range(1, 101)]
+        run.statuses['feed'].update({200: 98, 500: 1, 'TimeoutError': 1})
+        self.assertEqual(percentile(sorted(run.latencies['feed']), 90), 0.09)
+        lines = report(run, 2.0, locked=1)
+        self.assertEqual(
+            lines[:2],
+            [
+                'Запросов: 100 за 2.0 с, 50.0 запр./с',
+                'Ошибок: 2 (2.0%), database is locked: 1',
+            ],
+        )
+        self.assertIn('500: 1', lines[-1])
+
+    def test_command_runs_mixed_traffic(self):
+        """Короткий прогон поднимает сервер и проходит все операции."""
+        databases = [
+            os.path.join(settings.BASE_DIR, f'{alias}.sqlite3')
+            for alias in ('db', 'shard_1', 'shard_2')
+        ]
+        existed = {path for path in databases if os.path.exists(path)}
+        output = subprocess.check_output(
+            [sys.executable, 'manage.py', 'loadtest', '--users', '20',
+             '--requests', '60', '--concurrency', '4', '--seed', '1',
+             '--mix', 'feed=1,post=1,comment=1,follow=1'],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='yatube.settings'),
+            universal_newlines=True,
+            timeout=120,
+        )
+        self.assertIn('Запросов: 60 ', output)
+        for operation in ('feed', 'post', 'comment', 'follow'):
+            self.assertRegex(output, rf'\n{operation} +\d+')
+        created = {path for path in databases if os.path.exists(path)}
+        self.assertEqual(created - existed, set())
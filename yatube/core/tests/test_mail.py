@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+from ..mail import deliver_batch
+from ..models import OutgoingEmail
+
+TEMP_EMAIL_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+    OUTBOX_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User.objects.create_user(
+            username='HasNoName',
+            email='user@example.com',
+            password='password',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_EMAIL_DIR, ignore_errors=True)
+
+    def test_password_reset_is_queued(self):
+        """Сброс пароля только ставит письмо в очередь."""
+        self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, 'user@example.com')
+
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.SENT)
+
+    def test_attachments_and_subtypes_survive_the_queue(self):
+        """Вложения и тип тела доходят до отправки без изменений."""
+        message = mail.EmailMessage(
+            'Отчёт', '<p>Готово</p>', to=['user@example.com']
+        )
+        message.content_subtype = 'html'
+        message.mixed_subtype = 'related'
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.attach('note.txt', 'Текст', 'text/plain')
+        unsent = mail.EmailMessage('Никому', 'Пусто')
+        self.assertEqual(
+            mail.get_connection().send_messages([message, unsent]), 1
+        )
+
+        self.assertEqual(deliver_batch(), (1, 0))
+        sent = mail.outbox[0]
+        self.assertEqual(sent.content_subtype, 'html')
+        self.assertEqual(sent.mixed_subtype, 'related')
+        self.assertEqual(sent.attachments, [
+            ('data.bin', b'\x00\xff', 'application/octet-stream'),
+            ('note.txt', 'Текст', 'text/plain'),
+        ])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Неудачная отправка откладывается, а потом помечается FAILED."""
+        mail.send_mail('Тема', 'Текст', None, ['user@example.com'])
+        with mock.patch(
+            'django.core.mail.message.EmailMessage.send',
+            side_effect=ConnectionError('SMTP недоступен'),
+        ):
+            self.assertEqual(deliver_batch(), (0, 1))
+            email = OutgoingEmail.objects.get()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            self.assertEqual(deliver_batch(), (0, 0))
+
+            for _ in range(settings.OUTBOX_MAX_ATTEMPTS - 1):
+                OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+                deliver_batch()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+        self.assertIn('SMTP недоступен', email.last_error)
+
+    def test_abandoned_lease_is_reclaimed(self):
+        """Письма упавшего воркера снова отправляются."""
+        mail.send_mail('Тема', 'Текст', None, ['user@example.com'])
+        OutgoingEmail.objects.update(
+            status=OutgoingEmail.SENDING,
+            next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(deliver_batch(), (1, 0))
+
+    @override_settings(
+        OUTBOX_DELIVERY_BACKEND=(
+            'django.core.mail.backends.filebased.EmailBackend'
+        ),
+        EMAIL_FILE_PATH=TEMP_EMAIL_DIR,
+    )
+    def test_worker_command_with_file_backend(self):
+        """Команда отправляет очередь через файловый бэкенд."""
+        for _ in range(3):
+            mail.send_mail('Тема', 'Текст', None, ['user@example.com'])
+        call_command('send_queued_mail', batch_size=2, verbosity=0)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists()
+        )
+        self.assertTrue(os.listdir(TEMP_EMAIL_DIR))
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from posts.deletion import delete_post
+from posts.models import Post, User
+from ..media import parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.gif'), 'wb') as f:
+            f.write(CONTENT)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'open.bin'), 'wb') as f:
+            f.write(CONTENT)
+        cls.url = settings.MEDIA_URL + 'posts/a.gif'
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой', author=cls.author, image='posts/a.gif'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_parse_range(self):
+        """Разбор заголовка Range."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=0-1000', 100), (0, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=200-', 100)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с ETag."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertIn('ETag', response)
+
+    def test_range_request(self):
+        """Range отдаёт только запрошенный кусок."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(CONTENT)}'
+        )
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_if_none_match(self):
+        """Совпавший ETag даёт 304."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel')
+    def test_x_accel_redirect(self):
+        """В режиме x-accel файл передаёт прокси."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + 'posts/a.gif'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_hidden_and_outside_files_are_not_served(self):
+        """Скрытые файлы и пути вне MEDIA_ROOT не отдаются."""
+        for path in ('.secret', 'posts/../../manage.py', 'posts/none.gif'):
+            with self.subTest(path=path):
+                response = self.client.get(settings.MEDIA_URL + path)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_image_of_deleted_post_is_hidden(self):
+        """Картинку удалённого поста видят только сотрудники."""
+        Post.objects.filter(pk=self.post.pk).update(deleted_at=timezone.now())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        staff = Client()
+        staff.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        self.assertEqual(staff.get(self.url).status_code, HTTPStatus.OK)
+
+    def test_files_under_access_rule_are_not_publicly_cached(self):
+        """Файлы под правилом доступа общий кэш не хранит."""
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['Cache-Control'], settings.MEDIA_PRIVATE_CACHE_CONTROL
+        )
+        response = self.client.get(settings.MEDIA_URL + 'open.bin')
+        self.assertEqual(
+            response['Cache-Control'], settings.MEDIA_CACHE_CONTROL
+        )
+
+    def test_thumbnails_of_deleted_post_are_removed(self):
+        """Миниатюры без правила доступа удаляются вместе с постом."""
+        Image.new('RGB', (20, 20)).save(
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'real.gif')
+        )
+        post = Post.objects.create(
+            text='Настоящая картинка', author=self.author,
+            image='posts/real.gif',
+        )
+        thumbnail = get_thumbnail(post.image, '10x10')
+        self.assertEqual(
+            self.client.get(thumbnail.url).status_code, HTTPStatus.OK
+        )
+        delete_post(post)
+        self.assertEqual(
+            self.client.get(thumbnail.url).status_code, HTTPStatus.NOT_FOUND
+        )
@@ -0,0 +1,141 @@
+import json
+import shutil
+import sys
+import tempfile
+import threading
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import User
+from ..profiling import (
+    Sampler, collapsed, load_profile, make_token, profile_names,
+    save_profile, speedscope
+)
+
+TEMP_PROFILE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def sample_in_query(sampler):
+    sampler.query = 'SELECT  1;\nFROM x'
+    sampler.sample()
+    sampler.query = None
+
+
+def make_profile(view='posts:index'):
+    return {
+        'view': view, 'method': 'GET', 'path': '/', 'status': 200,
+        'reason': 'sample', 'started': 0, 'duration': 0.01,
+        'interval': 0.005, 'samples': 3, 'queries': 1, 'sql_time': 0.001,
+        'stacks': {'a:view;b:render': 2, 'a:view;[sql] SELECT 1': 1},
+    }
+
+
+@override_settings(PROFILE_ROOT=TEMP_PROFILE_ROOT)
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_PROFILE_ROOT, ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_sampler_collapses_stack_below_root(self):
+        """Стек обрезается по корневому кадру, SQL — последним кадром."""
+        sampler = Sampler(threading.get_ident(), sys._getframe(), 1)
+        sample_in_query(sampler)
+        sampler.sample()
+        self.assertEqual(sampler.stacks, {
+            f'{__name__}:sample_in_query;core.profiling:sample;'
+            '[sql] SELECT 1 FROM x': 1,
+            'core.profiling:sample': 1,
+        })
+
+    def test_token_profiles_request(self):
+        """Подписанный токен включает профилирование, чужой — нет."""
+        url = reverse('posts:follow_index')
+        response = self.client.get(url, HTTP_X_PROFILE='подделка')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(profile_names(), [])
+
+        token = make_token(self.staff)
+        response = self.client.get(url, HTTP_X_PROFILE=token)
+        profile = load_profile(response['X-Profile-Id'])
+        self.assertEqual(profile['view'], 'posts:follow_index')
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['reason'], 'token')
+        self.assertGreater(profile['queries'], 0)
+
+        response = self.client.get(url, {'profile': token})
+        self.assertIn('X-Profile-Id', response)
+
+    def test_token_requires_active_staff(self):
+        """Токен не-сотрудника или снятого с должности не действует."""
+        url = reverse('posts:follow_index')
+        response = self.client.get(url, HTTP_X_PROFILE=make_token(self.user))
+        self.assertNotIn('X-Profile-Id', response)
+
+        token = make_token(self.staff)
+        User.objects.filter(pk=self.staff.pk).update(is_staff=False)
+        response = self.client.get(url, HTTP_X_PROFILE=token)
+        self.assertNotIn('X-Profile-Id', response)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sample_rate_profiles_without_token(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('X-Profile-Id', response)
+        [name] = profile_names()
+        self.assertEqual(load_profile(name)['reason'], 'sample')
+
+    @override_settings(PROFILE_MAX_COUNT=2)
+    def test_store_keeps_newest_profiles(self):
+        names = [save_profile(make_profile()) for _ in range(3)]
+        self.assertEqual(profile_names(), names[:0:-1])
+        self.assertIsNone(load_profile(names[0]))
+        self.assertIsNone(load_profile('../settings'))
+
+    def test_export_formats(self):
+        profile = make_profile()
+        self.assertEqual(
+            collapsed(profile),
+            'a:view;[sql] SELECT 1 1\na:view;b:render 2\n',
+        )
+        data = speedscope(profile)
+        frames = [frame['name'] for frame in data['shared']['frames']]
+        self.assertEqual(frames, ['a:view', 'b:render', '[sql] SELECT 1'])
+        self.assertEqual(data['profiles'][0]['samples'], [[0, 1], [0, 2]])
+        self.assertEqual(data['profiles'][0]['weights'], [10.0, 5.0])
+
+    def test_profile_pages_are_staff_only(self):
+        name = save_profile(make_profile('posts:follow_index'))
+        list_url = reverse('profile_list')
+        download_url = reverse('profile_download', args=[name, 'json'])
+        self.assertEqual(self.client.get(list_url).status_code, 404)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        response = staff_client.get(list_url)
+        self.assertContains(response, 'posts:follow_index')
+        self.assertEqual(
+            response.context['groups'][0]['profiles'][0]['name'], name
+        )
+        response = staff_client.get(download_url)
+        self.assertEqual(
+            json.loads(response.content)['profiles'][0]['type'], 'sampled'
+        )
+        response = staff_client.get(
+            reverse('profile_download', args=[name, 'txt'])
+        )
+        self.assertContains(response, 'a:view;b:render 2')
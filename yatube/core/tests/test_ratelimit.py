@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from ..ratelimit import consume, parse_rate
+
+
+@override_settings(RATELIMITS={'add_comment': '2/m', 'follow': '1/h'})
+class RateLimitTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Строка лимита разбирается в ёмкость и период."""
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/h'), (5, 3600))
+        self.assertEqual(parse_rate('1/s'), (1, 1))
+
+    def test_bucket_refills_with_time(self):
+        """Жетоны восстанавливаются со временем."""
+        keys = ['ratelimit:test']
+        self.assertEqual(consume(keys, '1/m', now=0), 0)
+        self.assertEqual(consume(keys, '1/m', now=1), 59)
+        self.assertEqual(consume(keys, '1/m', now=60), 0)
+
+    def test_comment_limit_returns_429(self):
+        """Сверх лимита комментарии отклоняются с Retry-After."""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.id})
+        for _ in range(2):
+            response = self.authorized_client.post(url, {'text': 'Текст'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.authorized_client.post(url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.post.comments.count(), 2)
+
+    def test_follow_and_unfollow_share_bucket(self):
+        """Подписка и отписка расходуют общий лимит."""
+        kwargs = {'username': self.author.username}
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs=kwargs)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs=kwargs)
+        )
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_limit_can_be_disabled(self):
+        """Ограничение отключается настройкой."""
+        kwargs = {'username': self.author.username}
+        for _ in range(3):
+            response = self.authorized_client.get(
+                reverse('posts:profile_follow', kwargs=kwargs)
+            )
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
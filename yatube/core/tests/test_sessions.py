@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import User
+from ..backends import user_cache_key
+from ..sessions import SessionStore
+
+
+class CachedSessionTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='HasNoName',
+            password='old-secret-password',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(
+            username='HasNoName',
+            password='old-secret-password',
+        )
+
+    @mock.patch('core.backends.PROCESS_LOCAL_CACHES', ())
+    def test_logged_in_request_does_not_hit_database(self):
+        """Сессия и пользователь читаются из кэша."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+
+    @mock.patch('core.sessions.PROCESS_LOCAL_CACHES', ())
+    def test_session_changes_are_written_behind(self):
+        """С общим кэшем повторные изменения не пишутся в базу сразу."""
+        session = SessionStore()
+        session['step'] = 1
+        session.create()
+        session['step'] = 2
+        session.save()
+        session['step'] = 3
+        session.save()
+        stored = Session.objects.get(session_key=session.session_key)
+        self.assertEqual(stored.get_decoded()['step'], 2)
+        self.assertEqual(SessionStore(session.session_key)['step'], 3)
+
+    def test_process_local_cache_writes_through(self):
+        """С кэшем в памяти процесса изменения сразу попадают в базу."""
+        session = SessionStore()
+        session['step'] = 1
+        session.create()
+        session['step'] = 2
+        session.save()
+        stored = Session.objects.get(session_key=session.session_key)
+        self.assertEqual(stored.get_decoded()['step'], 2)
+        session['step'] = 3
+        session.save()
+        stored = Session.objects.get(session_key=session.session_key)
+        self.assertEqual(stored.get_decoded()['step'], 3)
+
+    @mock.patch('core.backends.PROCESS_LOCAL_CACHES', ())
+    def test_password_change_drops_cached_user(self):
+        """Смена пароля сбрасывает пользователя из кэша."""
+        self.authorized_client.get(reverse('about:author'))
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+        self.authorized_client.post(
+            reverse('users:password_change_form'),
+            {
+                'old_password': 'old-secret-password',
+                'new_password1': 'new-secret-password',
+                'new_password2': 'new-secret-password',
+            },
+        )
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    @mock.patch('core.backends.PROCESS_LOCAL_CACHES', ())
+    def test_logout_drops_cached_user(self):
+        """Выход сбрасывает пользователя из кэша."""
+        self.authorized_client.get(reverse('about:author'))
+        self.authorized_client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_process_local_cache_reads_user_from_database(self):
+        """С кэшем в памяти процесса деактивация видна сразу."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['user'].is_authenticated)
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..management.commands.profile_startup import parse_importtime
+
+LAZY_MODULES = (
+    'PIL.Image',
+    'sorl.thumbnail.engines.pil_engine',
+    'posts.admin',
+    'django.contrib.auth.admin',
+)
+
+
+class StartupTests(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        """Строки -X importtime разбираются в собственное и общее время."""
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        300 |   posts.models\n'
+            'import time:        80 |        500 | posts\n'
+        )
+        self.assertEqual(
+            parse_importtime(output),
+            [(120, 300, 'posts.models'), (80, 500, 'posts')]
+        )
+
+    def test_setup_does_not_import_heavy_modules(self):
+        """django.setup() не тянет Pillow, движки sorl и админку."""
+        code = (
+            'import django, json, sys; django.setup(); '
+            f'print(json.dumps([m for m in {LAZY_MODULES!r} '
+            'if m in sys.modules]))'
+        )
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env=dict(
+                os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE
+            ),
+            universal_newlines=True,
+        )
+        self.assertEqual(json.loads(output.splitlines()[-1]), [])
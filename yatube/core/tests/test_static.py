@@ -0,0 +1,91 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..static import IMMUTABLE_CACHE_CONTROL, StaticFilesApp
+
+TEMP_STATIC_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = b'body { color: red; }\n' * 100
+
+
+@override_settings(
+    STATICFILES_DIRS=[TEMP_STATIC_DIR],
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+)
+class StaticPipelineTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_STATIC_DIR, 'css'))
+        path = os.path.join(TEMP_STATIC_DIR, 'css', 'site.css')
+        with open(path, 'wb') as f:
+            f.write(CSS)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_DIR, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed_name = staticfiles_storage.stored_name('css/site.css')
+
+    def get(self, path, **environ):
+        captured = {}
+
+        def start_response(status, headers):
+            captured['status'] = status
+            captured['headers'] = dict(headers)
+
+        app = StaticFilesApp(lambda env, start: [b'django'])
+        body = b''.join(app(
+            {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **environ},
+            start_response,
+        ))
+        return captured.get('status'), captured.get('headers'), body
+
+    def test_collectstatic_writes_hashed_and_gzip_files(self):
+        """collectstatic кладёт файл с хешем и его gzip-копию."""
+        self.assertNotEqual(self.hashed_name, 'css/site.css')
+        path = os.path.join(TEMP_STATIC_ROOT, self.hashed_name)
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), CSS)
+
+    def test_static_tag_uses_manifest(self):
+        """Тег static отдаёт имя из манифеста."""
+        rendered = Template(
+            "{% load static %}{% static 'css/site.css' %}"
+        ).render(Context())
+        self.assertEqual(rendered, settings.STATIC_URL + self.hashed_name)
+
+    def test_app_serves_precompressed_immutable_file(self):
+        """Хешированный файл отдаётся сжатым и с immutable."""
+        status, headers, body = self.get(
+            settings.STATIC_URL + self.hashed_name,
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(body)).read(), CSS)
+
+    def test_app_revalidates_and_falls_through(self):
+        """ETag даёт 304, а прочие пути уходят в Django."""
+        url = settings.STATIC_URL + self.hashed_name
+        _, headers, _ = self.get(url)
+        self.assertNotIn('Content-Encoding', headers)
+        status, _, body = self.get(url, HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        self.assertEqual(self.get('/about/author/')[2], b'django')
+        self.assertEqual(self.get(settings.STATIC_URL + '../x')[2], b'django')
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from posts.deletion import release_image
+from posts.models import Post, User
+from ..storage import content_storage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_GC_GRACE=0)
+class ContentAddressedStorageTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_duplicates_share_file_and_thumbnails(self):
+        """Одинаковые загрузки — один файл и одни миниатюры."""
+        first = Post.objects.create(
+            text='Мем', author=self.author, image=upload('cat.GIF')
+        )
+        second = Post.objects.create(
+            text='Тот же мем', author=self.author, image=upload('copy.gif')
+        )
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(
+            first.image.name, f'posts/{digest[:2]}/{digest}.gif'
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(content_storage.path(first.image.name))
+        self.assertEqual(os.listdir(directory), [f'{digest}.gif'])
+        self.assertEqual(
+            get_thumbnail(first.image, '10x10').name,
+            get_thumbnail(second.image, '10x10').name,
+        )
+
+        other = Post.objects.create(
+            text='Другой', author=self.author,
+            image=upload('cat.gif', SMALL_GIF + b'\x00'),
+        )
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_file_is_released_with_last_reference(self):
+        first = Post.objects.create(
+            text='Мем', author=self.author, image=upload('cat.gif')
+        )
+        Post.objects.create(
+            text='Тот же мем', author=self.author, image=upload('cat.gif')
+        )
+        name = first.image.name
+
+        first.delete()
+        self.assertFalse(release_image(name))
+        self.assertTrue(content_storage.exists(name))
+
+        Post.objects.all().delete()
+        self.assertTrue(release_image(name))
+        self.assertFalse(content_storage.exists(name))
+
+    def test_post_edit_releases_replaced_image(self):
+        post = Post.objects.create(
+            text='Мем', author=self.author, image=upload('cat.gif')
+        )
+        old_name = post.image.name
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {
+                'text': 'Новая картинка',
+                'image': upload('dog.gif', SMALL_GIF + b'\x01'),
+            },
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(content_storage.exists(old_name))
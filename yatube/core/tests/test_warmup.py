@@ -0,0 +1,45 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.functional import empty
+from sorl.thumbnail import default
+
+from .. import warmup
+
+
+class WarmUpTests(TestCase):
+
+    def setUp(self):
+        warmup.ready.clear()
+
+    def tearDown(self):
+        warmup.ready.clear()
+
+    def test_all_project_templates_compile(self):
+        """Все шаблоны из templates/ компилируются."""
+        names = list(warmup.iter_template_names(settings.TEMPLATES_DIR))
+        self.assertIn('includes/posts.html', names)
+        self.assertEqual(warmup.warm_templates(), len(names))
+
+    def test_readiness_reports_warm_up_state(self):
+        """Готовность включается только после прогрева."""
+        url = reverse('readiness')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        warmup.start_warm_up(background=False)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json(), {'ready': True})
+
+    def test_thumbnails_and_databases_are_set_up(self):
+        engine = default.Engine()
+        with mock.patch.object(default, 'engine', engine):
+            warmup.warm_thumbnails()
+        self.assertIsNot(engine._wrapped, empty)
+        with self.assertNumQueries(1, using='default'):
+            self.assertEqual(warmup.warm_databases(), 1)
+        self.assertTrue(connection.is_usable())
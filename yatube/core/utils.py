@@ -0,0 +1,3 @@
+def file_etag(stat):
+    """Слабый по смыслу, но дешёвый ETag из времени изменения и размера."""
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
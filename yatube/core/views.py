@@ -1,5 +1,15 @@
+import json
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from .profiling import (
+    PROFILE_PARAM, collapsed, load_profile, make_token, profile_names,
+    speedscope
+)
+from .warmup import ready
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +17,66 @@ def page_not_found(request, exception):
 
 def forbidden(request, exception):
     return render(request, 'core/403.html', {'path': request.path}, status=403)
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request,
+        'core/429.html',
+        {'path': request.path, 'retry_after': retry_after},
+        status=429,
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def readiness(request):
+    is_ready = ready.is_set()
+    return JsonResponse({'ready': is_ready}, status=200 if is_ready else 503)
+
+
+@login_required
+def profile_list(request):
+    """Сохранённые профили запросов, сгруппированные по view."""
+    if not request.user.is_staff:
+        raise Http404
+    views = {}
+    for name in profile_names():
+        profile = load_profile(name)
+        if profile is not None:
+            views.setdefault(profile['view'], []).append(profile)
+    groups = [
+        {
+            'view': view,
+            'profiles': profiles,
+            'max_duration': max(p['duration'] for p in profiles),
+        }
+        for view, profiles in sorted(views.items())
+    ]
+    return render(request, 'core/profiles.html', {
+        'groups': groups,
+        'token': make_token(request.user),
+        'param': PROFILE_PARAM,
+    })
+
+
+@login_required
+def profile_download(request, name, fmt):
+    """Профиль в свёрнутых стеках (txt) или для speedscope (json)."""
+    if not request.user.is_staff or fmt not in ('txt', 'json'):
+        raise Http404
+    profile = load_profile(name)
+    if profile is None:
+        raise Http404
+    if fmt == 'txt':
+        return HttpResponse(
+            collapsed(profile), content_type='text/plain; charset=utf-8'
+        )
+    response = HttpResponse(
+        json.dumps(speedscope(profile), ensure_ascii=False),
+        content_type='application/json',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.speedscope.json"'
+    )
+    return response
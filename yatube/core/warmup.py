@@ -0,0 +1,109 @@
+"""Прогрев воркера после старта.
+
+``warm_up`` компилирует все шаблоны из каталогов ``TEMPLATES['DIRS']``
+в кэширующий загрузчик, строит таблицы URL, создаёт движок и хранилище
+sorl-thumbnail и проверяет соединения с используемыми базами. Пока
+прогрев не закончился, ``/health/ready/`` отвечает 503.
+
+Соединения в Django принадлежат потоку. При синхронном прогреве они
+остаются открытыми для первого запроса того же потока (если позволяет
+``CONN_MAX_AGE``), а фоновый поток после прогрева свои закрывает: ему
+достаются только загрузка драйвера и установка соединения с сервером.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+ready = threading.Event()
+
+
+def iter_template_names(directory):
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith(('.html', '.txt', '.xml')):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    compiled = 0
+    for backend in engines.all():
+        for directory in getattr(backend, 'dirs', []):
+            for name in iter_template_names(directory):
+                try:
+                    backend.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Не удалось скомпилировать %s', name)
+                else:
+                    compiled += 1
+    return compiled
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # reverse_dict строит таблицы для reverse() и импортирует все view.
+    return len(resolver.reverse_dict)
+
+
+def warm_thumbnails():
+    from django.utils.functional import empty
+    from sorl.thumbnail import default
+
+    # Объекты ленивые: создаём бэкенд, движок (с импортом PIL), kvstore
+    # и хранилище миниатюр явно.
+    lazy_objects = (
+        default.backend, default.engine, default.kvstore, default.storage
+    )
+    for lazy in lazy_objects:
+        if lazy._wrapped is empty:
+            lazy._setup()
+    return len(lazy_objects)
+
+
+def warm_databases():
+    """Открывает соединения с ``default`` и шардами постов."""
+    aliases = ['default'] + [
+        alias for alias in settings.POST_SHARDS if alias != 'default'
+    ]
+    for alias in aliases:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return len(aliases)
+
+
+def warm_up():
+    stages = (
+        ('templates', warm_templates),
+        ('urls', warm_urls),
+        ('thumbnails', warm_thumbnails),
+        ('databases', warm_databases),
+    )
+    for name, stage in stages:
+        try:
+            stage()
+        except Exception:
+            logger.exception('Прогрев "%s" не удался', name)
+    ready.set()
+
+
+def warm_up_in_thread():
+    try:
+        warm_up()
+    finally:
+        connections.close_all()
+
+
+def start_warm_up(background=True):
+    if not background:
+        warm_up()
+        return
+    threading.Thread(
+        target=warm_up_in_thread, name='warm-up', daemon=True
+    ).start()
@@ -0,0 +1,98 @@
+"""Архив постов по месяцам.
+
+Посты месяца выбираются диапазоном по индексу ``pub_date``, а навигация
+по годам и месяцам читает готовые счётчики ``ArchiveMonth``. Счётчики
+меняются вместе с постами: при создании, удалении и смене группы.
+"""
+from collections import Counter, OrderedDict
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .feeds import feed_keys
+from .models import ArchiveMonth, Post
+
+
+def month_range(year, month):
+    """Границы месяца в текущей временной зоне."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime(year, month, 1), tz)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, timezone.make_aware(end, tz)
+
+
+def month_of(pub_date):
+    local = timezone.localtime(pub_date)
+    return local.year, local.month
+
+
+def bump(counts):
+    """Прибавляет ``{(feed, year, month): delta}`` к счётчикам."""
+    for (feed, year, month), delta in counts.items():
+        if not delta:
+            continue
+        bucket = ArchiveMonth.objects.filter(
+            feed=feed, year=year, month=month
+        )
+        if bucket.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                ArchiveMonth.objects.create(
+                    feed=feed, year=year, month=month, count=delta
+                )
+        except IntegrityError:
+            bucket.update(count=F('count') + delta)
+
+
+def record_posts(posts, delta):
+    """Учитывает посты в архиве: ``delta`` — +1 или -1.
+
+    ``posts`` — итерируемое из (pub_date, author_id, group_id).
+    """
+    counts = Counter()
+    for pub_date, author_id, group_id in posts:
+        year, month = month_of(pub_date)
+        post = Post(author_id=author_id, group_id=group_id)
+        for feed in feed_keys(post):
+            counts[feed, year, month] += delta
+    bump(counts)
+
+
+def record_post(post, delta):
+    record_posts([(post.pub_date, post.author_id, post.group_id)], delta)
+
+
+def move_post(post, old_group_id):
+    """Переносит пост из архива старой группы в архив новой."""
+    year, month = month_of(post.pub_date)
+    counts = Counter()
+    if old_group_id:
+        counts[f'group:{old_group_id}', year, month] -= 1
+    if post.group_id:
+        counts[f'group:{post.group_id}', year, month] += 1
+    bump(counts)
+
+
+def archive_months(feed):
+    """Навигация: ``{год: [(1-е число месяца, число постов), ...]}``,
+    новые месяцы сверху."""
+    buckets = (
+        ArchiveMonth.objects.filter(feed=feed, count__gt=0)
+        .order_by('-year', '-month')
+        .values_list('year', 'month', 'count')
+    )
+    years = OrderedDict()
+    for year, month, count in buckets:
+        years.setdefault(year, []).append((date(year, month, 1), count))
+    return years
+
+
+def month_posts(queryset, year, month):
+    start, end = month_range(year, month)
+    return queryset.filter(pub_date__gte=start, pub_date__lt=end)
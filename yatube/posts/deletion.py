@@ -0,0 +1,281 @@
+"""Мягкое удаление постов и аккаунтов с фоновой очисткой.
+
+Удаление только проставляет ``Post.deleted_at`` (для аккаунта ещё
+``is_active=False`` и запись ``AccountDeletion``), сразу поправляет
+счётчики подписок и сбрасывает кэш лент, так что читатели удалённого
+больше не видят. Комментарии, подписки, уведомления, картинки и
+миниатюры удаляет команда ``purge_deleted`` пачками по
+``PURGE_CHUNK_SIZE`` строк, каждая в своей короткой транзакции, — без
+одного огромного каскада, который надолго блокирует SQLite. Только
+миниатюры скрытых картинок удаляются сразу: их отдают без проверки
+доступа.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.backends import invalidate_cached_user
+from core.cache import bump_cache_version
+
+from .archive import record_post, record_posts
+from .feeds import feed_keys, touch_feeds
+from .models import (
+    AccountDeletion, ArchivedComment, ArchivedPost, Comment, Follow,
+    Notification, Post, PostRevision, TrendingScore, User, UserStats
+)
+from .sharding import (
+    reference_aliases, replicate_update, shard_aliases, shard_for_author
+)
+
+FEED_CACHE_PREFIXES = ('index_page', 'trending_page')
+
+
+def delete_post(post):
+    with transaction.atomic():
+        if Post.objects.using(post._state.db).filter(pk=post.pk).update(
+            deleted_at=timezone.now()
+        ):
+            record_post(post, -1)
+    hide_thumbnails([post.image.name])
+    bump_cache_version(*FEED_CACHE_PREFIXES)
+    touch_feeds(*feed_keys(post))
+
+
+def delete_account(user):
+    """Скрывает аккаунт и все его посты, очистку оставляет на потом.
+
+    Счётчики тех, с кем пользователь связан подписками, уменьшаются здесь
+    же двумя UPDATE, поэтому сами подписки потом удаляются без сигналов.
+    """
+    posts = Post.objects.using(shard_for_author(user.pk)).filter(author=user)
+    group_ids = set(
+        posts.filter(group__isnull=False)
+        .values_list('group_id', flat=True)
+        .distinct()
+    )
+    images = set(
+        posts.exclude(image='').values_list('image', flat=True)
+    ) | set(
+        ArchivedPost.all_objects.filter(author=user)
+        .exclude(image='').values_list('image', flat=True)
+    )
+    with transaction.atomic():
+        _, created = AccountDeletion.objects.get_or_create(user=user)
+        if not created:
+            # Аккаунт уже удалён: счётчики второй раз не вычитаются.
+            return
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        replicate_update(User, user.pk, is_active=False)
+        record_posts(
+            posts.values_list('pub_date', 'author_id', 'group_id')
+            .iterator(),
+            -1,
+        )
+        posts.update(deleted_at=timezone.now())
+        # Архивные посты скрыты вместе с аккаунтом, их вычитаем из архива.
+        record_posts(
+            ArchivedPost.all_objects.filter(author=user)
+            .values_list('pub_date', 'author_id', 'group_id')
+            .iterator(),
+            -1,
+        )
+        UserStats.objects.filter(user__follower__author=user).update(
+            following_count=F('following_count') - 1
+        )
+        UserStats.objects.filter(user__following__user=user).update(
+            followers_count=F('followers_count') - 1
+        )
+    invalidate_cached_user(user.pk)
+    hide_thumbnails(images)
+    bump_cache_version(*FEED_CACHE_PREFIXES)
+    touch_feeds(
+        'index',
+        f'author:{user.pk}',
+        *(f'group:{group_id}' for group_id in group_ids),
+    )
+
+
+def delete_in_chunks(queryset, chunk_size, send_signals=True):
+    """Удаляет строки ``queryset`` пачками, каждую в своей транзакции.
+
+    Строки удаляются в той же базе, из которой читает ``queryset``.
+    """
+    model = queryset.model
+    ids_query = queryset.order_by().values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        ids = list(ids_query[:chunk_size])
+        if not ids:
+            return deleted
+        chunk = model._base_manager.using(queryset.db).filter(pk__in=ids)
+        with transaction.atomic(using=queryset.db):
+            if send_signals:
+                chunk.delete()
+            else:
+                # Тот же быстрый DELETE, которым Django удаляет строки
+                # без сигналов и зависимостей.
+                chunk._raw_delete(chunk.db)
+        deleted += len(ids)
+
+
+def image_in_use(name):
+    return any(
+        Post.all_objects.using(alias).filter(image=name).exists()
+        for alias in shard_aliases()
+    ) or ArchivedPost.all_objects.filter(image=name).exists()
+
+
+def image_public(name):
+    """Ссылается ли на картинку опубликованный пост активного автора."""
+    return any(
+        Post.objects.using(alias)
+        .filter(image=name, author__is_active=True).exists()
+        for alias in shard_aliases()
+    ) or ArchivedPost.objects.filter(image=name).exists()
+
+
+def image_visible(request, name):
+    """Правило MEDIA_ACCESS_RULES для картинок постов.
+
+    Картинку видно, пока на неё ссылается опубликованный пост активного
+    автора; картинки удалённых постов до очистки видят только сотрудники.
+    """
+    return request.user.is_staff or image_public(name)
+
+
+def hide_thumbnails(names):
+    """Удаляет миниатюры картинок, которые больше не видны всем.
+
+    Миниатюры отдаются без правила доступа, поэтому скрытие поста убирает
+    их сразу, не дожидаясь очистки. Сама картинка остаётся до
+    ``purge_deleted``.
+    """
+    from sorl.thumbnail import delete
+    from sorl.thumbnail.images import ImageFile
+
+    storage = Post._meta.get_field('image').storage
+    for name in names:
+        if name and not image_public(name):
+            delete(ImageFile(name, storage), delete_file=False)
+
+
+def release_image(name):
+    """Удаляет картинку и её миниатюры, если на неё больше нет ссылок.
+
+    Одинаковые загрузки хранятся одним файлом, поэтому удалять его можно,
+    только когда не осталось постов с этим именем. Файлы моложе
+    ``MEDIA_GC_GRACE`` оставляются сборщику мусора: их могли только что
+    загрузить повторно для нового поста.
+    """
+    from sorl.thumbnail import delete
+    from sorl.thumbnail.images import ImageFile
+
+    if not name or image_in_use(name):
+        return False
+    storage = Post._meta.get_field('image').storage
+    try:
+        modified = storage.get_modified_time(name)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return False
+    if timezone.now() - modified < timedelta(
+        seconds=settings.MEDIA_GC_GRACE
+    ):
+        return False
+    delete(ImageFile(name, storage))
+    return True
+
+
+def purge_post(post, chunk_size):
+    # Комментарии и рейтинг лежат на шарде поста, уведомления и версии —
+    # в default.
+    db = post._state.db
+    delete_in_chunks(
+        Comment.objects.using(db).filter(post_id=post.pk), chunk_size
+    )
+    delete_in_chunks(
+        Notification.objects.filter(post_id=post.pk), chunk_size
+    )
+    delete_in_chunks(
+        PostRevision.objects.filter(post_id=post.pk),
+        chunk_size,
+        send_signals=False,
+    )
+    TrendingScore.objects.using(db).filter(post_id=post.pk).delete()
+    Post.all_objects.using(db).filter(pk=post.pk).delete()
+    release_image(post.image.name)
+
+
+def purge_account(user_id, chunk_size):
+    """Удаляет следы аккаунта, у которого уже не осталось постов."""
+    for alias in shard_aliases():
+        delete_in_chunks(
+            Comment.objects.using(alias).filter(author_id=user_id),
+            chunk_size,
+        )
+    delete_in_chunks(
+        ArchivedComment.objects.filter(author_id=user_id), chunk_size
+    )
+    delete_in_chunks(
+        Notification.objects.filter(actor_id=user_id), chunk_size
+    )
+    delete_in_chunks(
+        Notification.objects.filter(recipient_id=user_id), chunk_size
+    )
+    for field in ('user_id', 'author_id'):
+        delete_in_chunks(
+            Follow.objects.filter(**{field: user_id}),
+            chunk_size,
+            send_signals=False,
+        )
+    archived = ArchivedPost.all_objects.filter(author_id=user_id)
+    delete_in_chunks(
+        ArchivedComment.objects.filter(post__in=archived), chunk_size
+    )
+    delete_in_chunks(
+        PostRevision.objects.filter(
+            post_id__in=archived.values('pk')
+        ),
+        chunk_size,
+        send_signals=False,
+    )
+    images = set(
+        archived.exclude(image='').values_list('image', flat=True)
+    )
+    delete_in_chunks(archived, chunk_size)
+    for name in images:
+        release_image(name)
+    User.objects.filter(pk=user_id).delete()
+    for alias in reference_aliases():
+        User.objects.using(alias).filter(pk=user_id).delete()
+
+
+def purge_deleted(chunk_size=None):
+    """Окончательно удаляет мягко удалённые посты и аккаунты.
+
+    Возвращает число удалённых постов и аккаунтов. Прерванный прогон
+    безопасно запускать снова: каждый шаг удаляет только то, что ещё
+    осталось.
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    posts = 0
+    for alias in shard_aliases():
+        deleted_posts = Post.all_objects.using(alias).filter(
+            deleted_at__isnull=False
+        ).order_by('deleted_at')
+        while True:
+            batch = list(deleted_posts.only('pk', 'image')[:chunk_size])
+            if not batch:
+                break
+            for post in batch:
+                purge_post(post, chunk_size)
+            posts += len(batch)
+
+    accounts = 0
+    for user_id in AccountDeletion.objects.values_list('user_id', flat=True):
+        purge_account(user_id, chunk_size)
+        accounts += 1
+    return posts, accounts
@@ -0,0 +1,130 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+У каждой ленты есть штамп версии в кэше — время последней записи в неё.
+Из штампа строятся сильный ETag и Last-Modified, поэтому условный запрос
+получает 304 без запросов к постам. Готовый XML кэшируется под ключом со
+штампом: после новой записи старый ключ просто перестаёт читаться.
+Штампы двигает ``touch_feeds`` при сохранении и удалении постов; если
+штампа в кэше нет, он восстанавливается из ``Post.updated`` и
+``Post.deleted_at``. Кэш у каждого процесса свой, поэтому штамп живёт
+``FEED_STAMP_TIMEOUT`` секунд: запись, сделанная другим воркером, видна
+в ленте не позже чем через этот срок.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+from django.utils.text import Truncator
+
+from .models import Post
+from .sharding import shard_aliases
+from .utils import absolute_url
+
+FEED_FORMATS = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+def feed_keys(post):
+    return (
+        'index',
+        f'author:{post.author_id}',
+        *([f'group:{post.group_id}'] if post.group_id else []),
+    )
+
+
+def stamp_cache_key(feed):
+    return f'feed_stamp:{feed}'
+
+
+def touch_feeds(*feeds):
+    """Отмечает запись в ленты ``feeds``."""
+    stamp = timezone.now().timestamp()
+    cache.set_many(
+        {stamp_cache_key(feed): stamp for feed in feeds},
+        settings.FEED_STAMP_TIMEOUT,
+    )
+
+
+def feed_stamp(feed):
+    stamp = cache.get(stamp_cache_key(feed))
+    if stamp is None:
+        kind, _, object_id = feed.partition(':')
+        stamps = []
+        for alias in shard_aliases():
+            posts = Post.all_objects.using(alias)
+            if kind == 'author':
+                posts = posts.filter(author_id=object_id)
+            elif kind == 'group':
+                posts = posts.filter(group_id=object_id)
+            latest = posts.aggregate(
+                updated=Max('updated'), deleted=Max('deleted_at')
+            )
+            stamps.extend(value for value in latest.values() if value)
+        stamp = max(stamps).timestamp() if stamps else 0.0
+        cache.add(stamp_cache_key(feed), stamp, settings.FEED_STAMP_TIMEOUT)
+    return stamp
+
+
+def build_feed(feed_class, title, link, description, posts):
+    feed = feed_class(
+        title=title,
+        link=absolute_url(link),
+        description=description,
+        language='ru',
+    )
+    for post in posts:
+        post_link = absolute_url(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        feed.add_item(
+            title=Truncator(post.text).chars(60),
+            link=post_link,
+            unique_id=post_link,
+            description=post.text,
+            pubdate=post.pub_date,
+            updateddate=post.updated,
+            author_name=(
+                post.author.get_full_name() or post.author.username
+            ),
+            categories=[post.group.title] if post.group else None,
+        )
+    return feed
+
+
+def render_feed(request, feed, feed_format, title, link, description,
+                get_posts):
+    """Ответ с лентой ``feed`` или 304 по штампу версии.
+
+    ``get_posts`` вызывается, только если XML нет в кэше.
+    """
+    feed_class = FEED_FORMATS.get(feed_format)
+    if feed_class is None:
+        raise Http404
+    stamp = feed_stamp(feed)
+    etag = f'"{feed}:{feed_format}:{stamp:.6f}"'
+    last_modified = int(stamp)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        content_key = f'feed:{feed}:{feed_format}:{stamp:.6f}'
+        content = cache.get(content_key)
+        if content is None:
+            posts = get_posts()[:settings.FEED_SIZE]
+            content = build_feed(
+                feed_class, title, link, description, posts
+            ).writeString('utf-8')
+            cache.set(content_key, content, settings.FEED_CACHE_TIMEOUT)
+        response = HttpResponse(
+            content, content_type=feed_class.content_type
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
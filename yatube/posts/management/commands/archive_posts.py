@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.partitions import archive_old_posts
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age', type=int, default=None,
+            help='Возраст поста в секундах, после которого он уходит '
+                 'в архив.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько постов переносить в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        posts, comments = archive_old_posts(
+            age=options['age'], chunk_size=options['chunk_size']
+        )
+        self.stdout.write(
+            f'В архив перенесено постов: {posts}, комментариев: {comments}'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Обновляет sitemap.xml: переписывает только изменённые шарды.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Переписать все шарды заново.',
+        )
+
+    def handle(self, *args, **options):
+        rewritten = build_sitemaps(full=options['full'])
+        self.stdout.write(f'Переписано шардов: {rewritten}')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import collect_media_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки и миниатюры sorl-thumbnail, на которые не '
+        'ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Не больше стольких удалений в секунду.',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+
+    def handle(self, *args, **options):
+        sources, files, size = collect_media_garbage(
+            dry_run=options['dry_run'],
+            rate=options['rate'],
+            grace=options['grace'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        verb = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} записей sorl: {sources}, файлов: {files} '
+            f'({size / 1024:.1f} КБ)'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.tags import reindex_tags
+
+
+class Command(BaseCommand):
+    help = 'Заново извлекает хештеги из текстов всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько постов обрабатывать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        total = reindex_tags(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Обработано постов: {total}')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    help = 'Окончательно удаляет мягко удалённые посты и аккаунты.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Сколько строк удалять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        posts, accounts = purge_deleted(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f'Удалено постов: {posts}, аккаунтов: {accounts}'
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import rollup
+
+
+class Command(BaseCommand):
+    help = 'Чистит и при необходимости пересчитывает рейтинг популярного.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинг из комментариев за окно.',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt, deleted = rollup(full=options['full'])
+        self.stdout.write(
+            f'Пересчитано постов: {rebuilt}, удалено устаревших: {deleted}'
+        )
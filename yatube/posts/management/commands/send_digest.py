@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.digest import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Рассылает ежедневный дайджест новых постов избранных авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        processed, sent, elapsed = send_digests(
+            chunk_size=options['chunk_size'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(
+            f'Подписчиков: {processed}, писем: {sent}, '
+            f'за {elapsed:.1f} с '
+            f'({processed / max(elapsed, 1e-6):.0f} польз./с)'
+        )
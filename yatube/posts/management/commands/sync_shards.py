@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.sharding import sync_references
+
+
+class Command(BaseCommand):
+    help = 'Копирует пользователей, группы и теги на все шарды постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк читать из default за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        copied = sync_references(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Скопировано строк справочников: {copied}')
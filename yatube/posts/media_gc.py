@@ -0,0 +1,232 @@
+"""Сборка мусора в MEDIA_ROOT: картинки постов и миниатюры sorl-thumbnail.
+
+Память не зависит от числа файлов: имена используемых файлов потоком
+читаются из БД и key-value хранилища sorl во временную SQLite-базу на
+диске, после чего дерево файлов обходится через ``os.scandir`` и каждое
+имя проверяется по этому множеству.
+
+Работать можно на живом сайте:
+
+* файлы моложе ``MEDIA_GC_GRACE`` секунд не трогаются — их могли
+  загрузить или сгенерировать уже после снимка ссылок;
+* перед удалением картинки поста ссылка на неё перепроверяется в БД;
+* удаление идёт не быстрее ``MEDIA_GC_RATE`` файлов в секунду.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .deletion import image_in_use
+from .models import ArchivedPost, Post
+from .sharding import shard_aliases
+
+INSERT_BATCH = 1000
+
+
+class MediaCollector:
+
+    def __init__(self, directory):
+        self.db = sqlite3.connect(os.path.join(directory, 'media_gc.db'))
+        self.db.executescript(
+            'CREATE TABLE live (name TEXT PRIMARY KEY);'
+            'CREATE TABLE orphan_sources (key TEXT PRIMARY KEY);'
+            'CREATE TABLE orphan_files ('
+            '  name TEXT PRIMARY KEY, size INTEGER, is_source INTEGER'
+            ');'
+        )
+
+    def add_many(self, table, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == INSERT_BATCH:
+                self.insert(table, batch)
+                batch = []
+        self.insert(table, batch)
+
+    def insert(self, table, batch):
+        if batch:
+            placeholders = ', '.join('?' * len(batch[0]))
+            self.db.executemany(
+                f'INSERT OR IGNORE INTO {table} VALUES ({placeholders})',
+                batch,
+            )
+
+    def is_live(self, name):
+        return self.db.execute(
+            'SELECT 1 FROM live WHERE name = ?', (name,)
+        ).fetchone() is not None
+
+    def collect_live_images(self):
+        querysets = [
+            Post.all_objects.using(alias) for alias in shard_aliases()
+        ]
+        querysets.append(ArchivedPost.all_objects.all())
+        for queryset in querysets:
+            names = (
+                queryset.exclude(image='')
+                .values_list('image', flat=True)
+                .iterator()
+            )
+            self.add_many('live', ((name,) for name in names))
+
+    def collect_thumbnails(self):
+        """Миниатюры живых картинок — в ``live``, остальные источники —
+        в ``orphan_sources``."""
+        from sorl.thumbnail.default import kvstore
+        from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+        from sorl.thumbnail.models import KVStore
+
+        source_keys = (
+            KVStore.objects.filter(
+                key__startswith=add_prefix('', 'thumbnails')
+            )
+            .values_list('key', flat=True)
+            .iterator()
+        )
+        orphans = []
+        for raw_key in source_keys:
+            key = del_prefix(raw_key)
+            source = kvstore._get(key)
+            if source is None or not self.is_live(source.name):
+                orphans.append((key,))
+                if len(orphans) == INSERT_BATCH:
+                    self.insert('orphan_sources', orphans)
+                    orphans = []
+                continue
+            thumbnails = (
+                kvstore._get(thumbnail_key)
+                for thumbnail_key in kvstore._get(key, 'thumbnails') or []
+            )
+            self.insert('live', [
+                (thumbnail.name,) for thumbnail in thumbnails if thumbnail
+            ])
+        self.insert('orphan_sources', orphans)
+
+    def scan(self, directory, is_source, older_than):
+        """Файлы в ``directory`` (имена относительно MEDIA_ROOT),
+        на которые ничто не ссылается."""
+        root = default_storage.path('')
+        pending = [os.path.join(root, directory)]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    name = os.path.relpath(entry.path, root).replace(
+                        os.sep, '/'
+                    )
+                    if stat.st_mtime < older_than and not self.is_live(name):
+                        yield name, stat.st_size, is_source
+
+    def collect_orphan_files(self, older_than):
+        from sorl.thumbnail.conf import settings as thumbnail_settings
+
+        upload_to = Post._meta.get_field('image').upload_to
+        self.add_many('orphan_files', self.scan(upload_to, 1, older_than))
+        self.add_many(
+            'orphan_files',
+            self.scan(thumbnail_settings.THUMBNAIL_PREFIX, 0, older_than),
+        )
+
+    def orphan_sources(self):
+        return (key for key, in self.db.execute(
+            'SELECT key FROM orphan_sources'
+        ))
+
+    def orphan_files(self):
+        return self.db.execute(
+            'SELECT name, size, is_source FROM orphan_files ORDER BY name'
+        )
+
+    def close(self):
+        self.db.close()
+
+
+def throttle(rate):
+    """Генератор-метроном: каждый ``next()`` ждёт своей очереди."""
+    interval = 1 / rate if rate else 0
+    next_at = time.monotonic()
+    while True:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_at = max(next_at, time.monotonic()) + interval
+        yield
+
+
+def delete_orphan_sources(keys, tick, dry_run, stdout):
+    from sorl.thumbnail.default import kvstore
+
+    count = 0
+    for key in keys:
+        count += 1
+        if stdout:
+            stdout.write(f'sorl: {key}')
+        if dry_run:
+            continue
+        next(tick)
+        source = kvstore._get(key)
+        if source is None:
+            kvstore._delete(key, 'thumbnails')
+        elif not image_in_use(source.name):
+            kvstore.delete(source)
+    return count
+
+
+def delete_orphan_files(rows, tick, dry_run, stdout):
+    count = size = 0
+    for name, file_size, is_source in rows:
+        if not default_storage.exists(name):
+            continue
+        if stdout:
+            stdout.write(f'{name} ({file_size} байт)')
+        count += 1
+        size += file_size
+        if dry_run:
+            continue
+        if is_source and image_in_use(name):
+            continue
+        next(tick)
+        default_storage.delete(name)
+    return count, size
+
+
+def collect_media_garbage(dry_run=False, rate=None, grace=None,
+                          stdout=None):
+    """Удаляет файлы и записи sorl, на которые не ссылается ни один пост.
+
+    Возвращает число осиротевших записей sorl, файлов и их размер в
+    байтах. С ``dry_run`` только считает и перечисляет их в ``stdout``.
+    """
+    rate = settings.MEDIA_GC_RATE if rate is None else rate
+    grace = settings.MEDIA_GC_GRACE if grace is None else grace
+    older_than = time.time() - grace
+
+    with tempfile.TemporaryDirectory() as directory:
+        collector = MediaCollector(directory)
+        try:
+            collector.collect_live_images()
+            collector.collect_thumbnails()
+            collector.collect_orphan_files(older_than)
+
+            tick = throttle(rate)
+            sources = delete_orphan_sources(
+                collector.orphan_sources(), tick, dry_run, stdout
+            )
+            files, size = delete_orphan_files(
+                collector.orphan_files(), tick, dry_run, stdout
+            )
+        finally:
+            collector.close()
+    return sources, files, size
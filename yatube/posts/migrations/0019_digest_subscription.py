@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestSubscription',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('last_sent', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Последняя отправка')),
+            ],
+            options={
+                'verbose_name': 'Подписка на дайджест',
+                'verbose_name_plural': 'Подписки на дайджест',
+            },
+        ),
+    ]
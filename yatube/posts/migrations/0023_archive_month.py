@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:38
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_archive(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    ArchiveMonth = apps.get_model('posts', 'ArchiveMonth')
+    counts = Counter()
+    rows = (
+        Post.objects.filter(deleted_at__isnull=True)
+        .values_list('pub_date', 'author_id', 'group_id')
+        .iterator()
+    )
+    for pub_date, author_id, group_id in rows:
+        local = timezone.localtime(pub_date)
+        feeds = ['index', f'author:{author_id}']
+        if group_id:
+            feeds.append(f'group:{group_id}')
+        for feed in feeds:
+            counts[feed, local.year, local.month] += 1
+    ArchiveMonth.objects.bulk_create(
+        (
+            ArchiveMonth(feed=feed, year=year, month=month, count=count)
+            for (feed, year, month), count in counts.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=32, verbose_name='Лента')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('count', models.IntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Месяц архива',
+                'verbose_name_plural': 'Месяцы архива',
+                'unique_together': {('feed', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_archive, migrations.RunPython.noop),
+    ]
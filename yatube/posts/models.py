@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import content_storage
+
 User = get_user_model()
 
 
@@ -17,6 +19,24 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+
+    def create(self, **kwargs):
+        # Без явного using() базу выбирает роутер по самому посту, чтобы
+        # при шардировании пост попал на шард автора.
+        post = self.model(**kwargs)
+        self._for_write = True
+        post.save(force_insert=True, using=self._db)
+        return post
+
+
+class PublishedManager(models.Manager.from_queryset(PostQuerySet)):
+    """Посты без мягко удалённых."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -28,6 +48,11 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         db_index=True,
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        db_index=True,
+    )
 
     author = models.ForeignKey(
         User,
@@ -48,9 +73,27 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True,
+        db_index=True,
         help_text='Картинка к посту',
     )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+
+    tags = models.ManyToManyField(
+        'Tag',
+        through='PostTag',
+        related_name='posts',
+        verbose_name='Теги',
+    )
+
+    objects = PublishedManager()
+    all_objects = models.Manager.from_queryset(PostQuerySet)()
 
     class Meta:
         ordering = ['-pub_date']
@@ -84,6 +127,7 @@ class Comment(models.Model):
     created = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
+        db_index=True,
     )
 
     class Meta:
@@ -107,6 +151,354 @@ class Follow(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['author', 'id']),
+            models.Index(fields=['user', 'id']),
+        ]
+        # Счётчики в UserStats считают каждую строку подписки.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
     def __str__(self):
         return f"Последователь: '{self.user}', автор: '{self.author}'"
 
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя вместо COUNT-запросов."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    followers_count = models.PositiveIntegerField('Подписчики', default=0)
+    following_count = models.PositiveIntegerField('Подписки', default=0)
+    unread_notifications = models.PositiveIntegerField(
+        'Непрочитанные уведомления',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'Счётчики {self.user_id}'
+
+    @classmethod
+    def get_for(cls, user):
+        try:
+            return user.stats
+        except cls.DoesNotExist:
+            return cls(user=user)
+
+    @classmethod
+    def bump(cls, user_id, **deltas):
+        """Атомарно прибавляет ``deltas`` к счётчикам пользователя."""
+        cls.objects.get_or_create(user_id=user_id)
+        cls.objects.filter(user_id=user_id).update(**{
+            field: models.F(field) + delta for field, delta in deltas.items()
+        })
+
+
+class TrendingScore(models.Model):
+    """Предрасчитанный рейтинг поста по затухающей активности комментариев.
+
+    В ``score`` хранится log(sum(exp(t_i / tau))) по временам
+    комментариев, поэтому порядок по нему совпадает с порядком по
+    затухающей сумме в любой момент, и старые строки не нужно пересчитывать.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Рейтинг', db_index=True)
+    updated = models.DateTimeField('Последняя активность', db_index=True)
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class Notification(models.Model):
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    KINDS = (
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Последний автор события',
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    # Без ограничения в БД: при шардировании пост лежит в другой базе.
+    post = models.ForeignKey(
+        Post,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    count = models.PositiveIntegerField('Число событий', default=1)
+    is_read = models.BooleanField('Прочитано', default=False)
+    updated = models.DateTimeField('Последнее событие')
+
+    class Meta:
+        ordering = ['-updated']
+        indexes = [
+            models.Index(fields=['recipient', 'updated']),
+            models.Index(fields=['recipient', 'is_read', 'kind']),
+        ]
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} для {self.recipient_id}'
+
+
+class DigestSubscription(models.Model):
+    """Подписка на ежедневный дайджест постов избранных авторов."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='digest',
+        verbose_name='Пользователь',
+    )
+    last_sent = models.DateTimeField(
+        'Последняя отправка',
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Подписка на дайджест'
+        verbose_name_plural = 'Подписки на дайджест'
+
+    def __str__(self):
+        return f'Дайджест для {self.user_id}'
+
+
+class AccountDeletion(models.Model):
+    """Аккаунт, удалённый пользователем и ждущий фоновой очистки."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    requested = models.DateTimeField('Дата запроса', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Удаление аккаунта'
+        verbose_name_plural = 'Удаления аккаунтов'
+
+    def __str__(self):
+        return f'Удаление {self.user_id}'
+
+
+class ArchiveMonth(models.Model):
+    """Число постов ленты за месяц для навигации по архиву.
+
+    ``feed`` — ключ ленты, как у RSS: ``index``, ``group:<id>`` или
+    ``author:<id>``. Счётчики ведутся при создании и удалении постов,
+    поэтому навигация не требует GROUP BY по датам.
+    """
+    feed = models.CharField('Лента', max_length=32)
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    count = models.IntegerField('Число постов', default=0)
+
+    class Meta:
+        unique_together = ('feed', 'year', 'month')
+        verbose_name = 'Месяц архива'
+        verbose_name_plural = 'Месяцы архива'
+
+    def __str__(self):
+        return f'{self.feed} {self.year}-{self.month:02}: {self.count}'
+
+
+class Tag(models.Model):
+    """Хештег из текста поста, имя хранится в нижнем регистре."""
+    name = models.CharField('Имя', max_length=64, unique=True)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Связь поста с тегом.
+
+    ``pub_date`` копирует дату поста, чтобы лента тега читалась по индексу
+    (tag, pub_date) без сортировки по таблице постов.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Пост',
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+        verbose_name='Тег',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        unique_together = ('post', 'tag')
+        indexes = [
+            models.Index(fields=['tag', '-pub_date']),
+        ]
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+
+    def __str__(self):
+        return f'{self.post_id} #{self.tag_id}'
+
+
+class PostRevision(models.Model):
+    """Версия текста поста после правки.
+
+    ``data`` — сжатый zlib текст версии (``is_snapshot``) или дельта к
+    предыдущей версии; полные снимки идут через каждые
+    ``REVISION_SNAPSHOT_INTERVAL`` версий.
+    """
+    # Без ограничения в БД: версии переживают перенос поста в архив.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='revisions',
+        verbose_name='Пост',
+    )
+    number = models.PositiveIntegerField('Номер версии')
+    created = models.DateTimeField('Дата версии')
+    is_snapshot = models.BooleanField('Полный снимок', default=False)
+    data = models.BinaryField('Данные')
+
+    class Meta:
+        ordering = ['-number']
+        unique_together = ('post', 'number')
+        verbose_name = 'Версия поста'
+        verbose_name_plural = 'Версии постов'
+
+    def __str__(self):
+        return f'{self.post_id} v{self.number}'
+
+
+class ActiveAuthorManager(models.Manager):
+    """Архивные посты без постов удалённых аккаунтов."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(author__is_active=True)
+
+
+class ArchivedPost(models.Model):
+    """Пост старше ``POST_ARCHIVE_AGE``, перенесённый из ``Post``.
+
+    id совпадает с исходным, поэтому ссылки на пост не меняются.
+    Архивные посты только читаются.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации', db_index=True)
+    updated = models.DateTimeField('Дата изменения')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=content_storage,
+        blank=True,
+        db_index=True,
+    )
+
+    objects = ActiveAuthorManager()
+    all_objects = models.Manager()
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    """Комментарий к архивному посту, id совпадает с исходным."""
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор',
+    )
+    text = models.TextField('Текст комментария')
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ShardTicket(models.Model):
+    """Счётчик глобальных id постов в режиме шардирования."""
+
+    class Meta:
+        verbose_name = 'Номер поста'
+        verbose_name_plural = 'Номера постов'
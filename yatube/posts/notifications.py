@@ -0,0 +1,101 @@
+"""Уведомления о комментариях к постам и новых подписчиках.
+
+Повторные события одного типа по одному посту, пришедшие, пока
+уведомление не прочитано и не старше ``NOTIFICATION_COLLAPSE_WINDOW``,
+сворачиваются в одну строку с растущим ``count``. Так частые
+комментарии дают одно UPDATE вместо новой строки. Число непрочитанных
+хранится в ``UserStats`` и отдаётся в шапку из кэша. Уведомления лежат в
+``default``, а посты, на которые они ссылаются, — на шардах авторов.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, Post, UserStats
+from .sharding import shard_for_post
+
+
+def unread_cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def notify(recipient_id, actor_id, kind, post_id=None):
+    if recipient_id == actor_id:
+        return
+    now = timezone.now()
+    since = now - timedelta(seconds=settings.NOTIFICATION_COLLAPSE_WINDOW)
+    with transaction.atomic():
+        collapsed = Notification.objects.filter(
+            recipient_id=recipient_id,
+            is_read=False,
+            kind=kind,
+            post_id=post_id,
+            updated__gte=since,
+        ).update(count=F('count') + 1, actor_id=actor_id, updated=now)
+        if collapsed:
+            return
+        Notification.objects.create(
+            recipient_id=recipient_id,
+            actor_id=actor_id,
+            kind=kind,
+            post_id=post_id,
+            updated=now,
+        )
+        UserStats.bump(recipient_id, unread_notifications=1)
+    cache.delete(unread_cache_key(recipient_id))
+
+
+def unread_count(user):
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = (
+            UserStats.objects.filter(user=user)
+            .values_list('unread_notifications', flat=True)
+            .first()
+        ) or 0
+        cache.set(key, count, settings.NOTIFICATION_BADGE_TIMEOUT)
+    return count
+
+
+def mark_read(user, notifications, seen_at):
+    """Отмечает прочитанными показанные пользователю уведомления.
+
+    Строка, в которую после ``seen_at`` свернулось новое событие,
+    остаётся непрочитанной: его пользователь ещё не видел.
+    """
+    with transaction.atomic():
+        marked = Notification.objects.filter(
+            recipient=user,
+            is_read=False,
+            updated__lte=seen_at,
+            pk__in=[notification.pk for notification in notifications],
+        ).update(is_read=True)
+        if marked:
+            UserStats.objects.filter(user=user).update(
+                unread_notifications=F('unread_notifications') - marked
+            )
+    cache.delete(unread_cache_key(user.pk))
+
+
+def attach_posts(notifications):
+    """Подставляет уведомлениям их посты, читая каждый шард один раз."""
+    notifications = list(notifications)
+    post_ids = defaultdict(set)
+    for notification in notifications:
+        if notification.post_id is not None:
+            post_ids[shard_for_post(notification.post_id)].add(
+                notification.post_id
+            )
+    posts = {}
+    for alias, ids in post_ids.items():
+        posts.update(Post.objects.using(alias).in_bulk(ids))
+    for notification in notifications:
+        Notification.post.field.set_cached_value(
+            notification, posts.get(notification.post_id)
+        )
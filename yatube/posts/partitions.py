@@ -0,0 +1,154 @@
+"""Горячая и холодная таблицы постов.
+
+Посты старше ``POST_ARCHIVE_AGE`` вместе с комментариями переносятся из
+``Post`` и ``Comment`` в ``ArchivedPost`` и ``ArchivedComment`` с теми же
+id, так что в горячей таблице остаются только свежие строки, с которыми
+работают ленты. Страница поста, профиль и архив по месяцам читают обе
+таблицы: ``get_post_or_404`` ищет пост сначала в горячей, а
+``ChainedPosts`` отдаёт пагинатору горячие посты, за ними архивные.
+Архивные посты доступны только на чтение; теги, рейтинг и ссылки
+уведомлений на них при переносе снимаются. При шардировании посты
+переносятся с каждого шарда, а архив общий и лежит в ``default``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from core.cache import bump_cache_version
+
+from .feeds import feed_keys, touch_feeds
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Notification, Post, PostTag,
+    TrendingScore
+)
+from .sharding import shard_aliases, shard_for_post
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'updated', 'author_id', 'group_id', 'image'
+)
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def raw_delete(queryset):
+    # DELETE без сигналов и каскада: зависимые строки уже убраны.
+    queryset._raw_delete(queryset.db)
+
+
+def move_posts(post_ids, using='default'):
+    """Переносит посты ``post_ids`` с комментариями с шарда ``using``.
+
+    Архив лежит в ``default``. Возвращает число перенесённых
+    комментариев.
+    """
+    with transaction.atomic(), transaction.atomic(using=using):
+        posts = Post.objects.using(using).filter(pk__in=post_ids)
+        ArchivedPost.all_objects.bulk_create(
+            ArchivedPost(**row) for row in posts.values(*POST_FIELDS)
+        )
+        comments = Comment.objects.using(using).filter(post_id__in=post_ids)
+        archived = ArchivedComment.objects.bulk_create(
+            ArchivedComment(**row)
+            for row in comments.values(*COMMENT_FIELDS).iterator()
+        )
+        raw_delete(comments)
+        raw_delete(
+            PostTag.objects.using(using).filter(post_id__in=post_ids)
+        )
+        raw_delete(
+            TrendingScore.objects.using(using).filter(post_id__in=post_ids)
+        )
+        Notification.objects.filter(post_id__in=post_ids).update(post=None)
+        raw_delete(posts)
+    return len(archived)
+
+
+def archive_old_posts(age=None, chunk_size=None):
+    """Переносит в архив посты старше ``age`` секунд пачками.
+
+    Мягко удалённые посты не переносятся: их удалит ``purge_deleted``.
+    Возвращает (число постов, число комментариев).
+    """
+    age = settings.POST_ARCHIVE_AGE if age is None else age
+    chunk_size = chunk_size or settings.POST_ARCHIVE_CHUNK_SIZE
+    cutoff = timezone.now() - timedelta(seconds=age)
+    moved_posts = moved_comments = 0
+    feeds = set()
+    for alias in shard_aliases():
+        old = (
+            Post.objects.using(alias).filter(pub_date__lt=cutoff)
+            .order_by('pk')
+        )
+        while True:
+            rows = list(
+                old.values_list('pk', 'author_id', 'group_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            for _, author_id, group_id in rows:
+                post = Post(author_id=author_id, group_id=group_id)
+                feeds.update(feed_keys(post))
+            moved_comments += move_posts([pk for pk, _, _ in rows], alias)
+            moved_posts += len(rows)
+    if moved_posts:
+        bump_cache_version('index_page', 'trending_page')
+        touch_feeds(*feeds)
+    return moved_posts, moved_comments
+
+
+def get_post_or_404(post_id):
+    """Пост из горячей таблицы или, если его там нет, из архива."""
+    try:
+        return Post.objects.using(shard_for_post(post_id)).select_related(
+            'author', 'group'
+        ).get(pk=post_id)
+    except Post.DoesNotExist:
+        pass
+    try:
+        return ArchivedPost.objects.select_related('author', 'group').get(
+            pk=post_id
+        )
+    except ArchivedPost.DoesNotExist:
+        raise Http404
+
+
+class ChainedPosts:
+    """Горячие посты, за ними архивные — как один список для Paginator.
+
+    Архивные посты всегда старше горячих, поэтому при сортировке обеих
+    частей по убыванию ``pub_date`` склейка тоже отсортирована. Срез
+    читает только ту таблицу, в которую попадает.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+        self._hot_count = None
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count() + self.cold.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        hot_count = self.hot_count()
+        items = []
+        if start < hot_count:
+            items.extend(self.hot[start:min(stop, hot_count)])
+        if stop > hot_count:
+            items.extend(
+                self.cold[max(start - hot_count, 0):stop - hot_count]
+            )
+        return items
@@ -0,0 +1,100 @@
+"""История правок текста постов.
+
+Каждая правка текста пишет ``PostRevision``. Версии между полными
+снимками хранятся сжатыми дельтами к предыдущей: список кусков, где пара
+чисел — диапазон, скопированный из прошлой версии, а строка — вставка.
+Любая версия собирается из ближайшего снимка и дельт после него, которые
+читаются одним запросом. Текущий текст по-прежнему лежит в ``Post.text``.
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import PostRevision
+
+
+def pack(value):
+    return zlib.compress(
+        json.dumps(value, ensure_ascii=False).encode('utf-8')
+    )
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def make_delta(old, new):
+    delta = []
+    matcher = SequenceMatcher(None, old, new)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j1 < j2:
+            delta.append(new[j1:j2])
+    return delta
+
+
+def apply_delta(old, delta):
+    return ''.join(
+        part if isinstance(part, str) else old[part[0]:part[1]]
+        for part in delta
+    )
+
+
+def record_revision(post, old_text, old_updated):
+    """Сохраняет текущий текст поста как новую версию.
+
+    При первой правке сначала сохраняется снимок исходного текста.
+    Правки без изменения текста версий не создают.
+    """
+    if post.text == old_text:
+        return
+    interval = settings.REVISION_SNAPSHOT_INTERVAL
+    with transaction.atomic():
+        last = PostRevision.objects.filter(post_id=post.pk).aggregate(
+            number=Max('number')
+        )['number']
+        if last is None:
+            PostRevision.objects.create(
+                post=post, number=1, created=old_updated,
+                is_snapshot=True, data=pack(old_text),
+            )
+            last = 1
+        number = last + 1
+        is_snapshot = (number - 1) % interval == 0
+        PostRevision.objects.create(
+            post=post,
+            number=number,
+            created=timezone.now(),
+            is_snapshot=is_snapshot,
+            data=pack(
+                post.text if is_snapshot
+                else make_delta(old_text, post.text)
+            ),
+        )
+
+
+def revision_text(post, number):
+    """Текст версии ``number`` или None, если такой версии нет."""
+    revisions = PostRevision.objects.filter(post_id=post.pk)
+    snapshots = revisions.filter(number__lte=number, is_snapshot=True)
+    chain = list(
+        revisions.filter(
+            number__lte=number,
+            number__gte=snapshots.values('post').annotate(
+                start=Max('number')
+            ).values('start'),
+        ).order_by('number').values_list('number', 'is_snapshot', 'data')
+    )
+    if not chain or chain[-1][0] != number:
+        return None
+    text = ''
+    for _, is_snapshot, data in chain:
+        value = unpack(data)
+        text = value if is_snapshot else apply_delta(text, value)
+    return text
@@ -0,0 +1,216 @@
+"""Шардирование постов по авторам между несколькими базами.
+
+Включается списком алиасов ``POST_SHARDS``; пустой список — всё живёт в
+``default``. Шард автора берётся из ``POST_SHARD_MAP`` (явные переносы
+горячих авторов), иначе по остатку от деления id автора.
+
+На шард автора пишутся его посты и всё, что принадлежит посту:
+комментарии, теги поста, рейтинг. id поста выдаёт общий счётчик в
+``default``, а младшие биты id хранят номер шарда, так что по id сразу
+понятно, где пост лежит. Пользователи, группы и теги — справочники: их
+строки копируются на каждый шард, чтобы внешние ключи и JOIN работали
+локально. Подписки, уведомления, счётчики и версии остаются в ``default``.
+
+Общие ленты собираются k-путевым слиянием отсортированных потоков с
+каждого шарда (``across_shards``). Включать режим нужно на пустых
+таблицах постов: старые id номера шарда не содержат. Уже существующие
+справочники копирует команда ``sync_shards``.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .models import Group, Post, ShardTicket, Tag
+
+SHARD_ID_SPACE = 64
+SHARDED_MODELS = {'post', 'comment', 'posttag', 'trendingscore'}
+# Справочники приложения posts: копии есть на каждом шарде.
+REFERENCE_MODELS = {'group', 'tag'}
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def shard_aliases():
+    return list(settings.POST_SHARDS) or ['default']
+
+
+def reference_aliases():
+    """Шарды, куда копируются справочники."""
+    return [alias for alias in settings.POST_SHARDS if alias != 'default']
+
+
+def shard_for_author(author_id):
+    shards = shard_aliases()
+    return settings.POST_SHARD_MAP.get(author_id) or shards[
+        author_id % len(shards)
+    ]
+
+
+def shard_for_post(post_id):
+    """Шард поста по младшим битам id.
+
+    id, выданные не ``allocate_post_id`` (посты до включения режима,
+    чужие номера из URL), указывают за пределы списка шардов: такие
+    посты ищутся в ``default``, где их не окажется — получится 404.
+    """
+    index = post_id % SHARD_ID_SPACE
+    if not enabled() or index >= len(settings.POST_SHARDS):
+        return 'default'
+    return settings.POST_SHARDS[index]
+
+
+def allocate_post_id(author_id):
+    """Глобальный id нового поста с номером шарда автора в младших битах."""
+    ticket = ShardTicket.objects.using('default').create()
+    number = ticket.pk
+    ticket.delete()
+    index = settings.POST_SHARDS.index(shard_for_author(author_id))
+    return number * SHARD_ID_SPACE + index
+
+
+def shard_of(model, instance):
+    """Шард строк ``model``, связанных с ``instance``, если он известен.
+
+    Пост — по своему id или автору, принадлежащие посту строки и
+    ссылки на пост — по ``post_id``, посты пользователя — по его шарду.
+    """
+    if isinstance(instance, Post):
+        if instance.pk is not None:
+            return shard_for_post(instance.pk)
+        return shard_for_author(instance.author_id)
+    post_id = getattr(instance, 'post_id', None)
+    if post_id is not None:
+        return shard_for_post(post_id)
+    if model is Post and isinstance(instance, get_user_model()):
+        return shard_for_author(instance.pk)
+    return None
+
+
+class AuthorShardRouter:
+    """Направляет посты и принадлежащие им строки на шард автора.
+
+    Без подсказки ``instance`` (общие выборки, bulk-операции) решение
+    остаётся за вызывающим кодом: ``using()`` или ``across_shards``.
+    Остальные модели posts, кроме справочников, живут только в
+    ``default``: иначе связанный менеджер поста с шарда (``post.revisions``)
+    пошёл бы на шард вслед за подсказкой.
+    """
+
+    def route(self, model, hints):
+        if not enabled() or model._meta.app_label != 'posts':
+            return None
+        name = model._meta.model_name
+        if name in REFERENCE_MODELS:
+            return None
+        if name not in SHARDED_MODELS:
+            return 'default'
+        instance = hints.get('instance')
+        return shard_of(model, instance) if instance is not None else None
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Справочники есть на каждом шарде.
+        return True if enabled() else None
+
+
+def replicate(instance):
+    """Копирует строку справочника на все шарды."""
+    model = type(instance)
+    fields = {
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+    }
+    for alias in reference_aliases():
+        rows = model._base_manager.using(alias).filter(pk=instance.pk)
+        if not rows.update(**fields):
+            model._base_manager.using(alias).bulk_create(
+                [model(pk=instance.pk, **fields)]
+            )
+
+
+def copy_references(instances):
+    """Добавляет на шарды новые строки справочника, не трогая старые."""
+    if not instances:
+        return
+    model = type(instances[0])
+    for alias in reference_aliases():
+        model._base_manager.using(alias).bulk_create(
+            instances, ignore_conflicts=True
+        )
+
+
+def replicate_update(model, pk, **fields):
+    """Повторяет на шардах UPDATE справочника, сделанный в обход save()."""
+    for alias in reference_aliases():
+        model._base_manager.using(alias).filter(pk=pk).update(**fields)
+
+
+def sync_references(chunk_size=1000):
+    """Копирует все справочники на шарды, например после включения режима.
+
+    Возвращает число скопированных строк.
+    """
+    copied = 0
+    for model in (get_user_model(), Group, Tag):
+        for instance in model._base_manager.order_by('pk').iterator(
+            chunk_size=chunk_size
+        ):
+            replicate(instance)
+            copied += 1
+    return copied
+
+
+class MergedPosts:
+    """Посты с нескольких шардов как один список для Paginator.
+
+    Каждый шард отдаёт поток, отсортированный по убыванию (pub_date, id);
+    потоки сливаются ``heapq.merge``, и со всех шардов читается не больше
+    ``stop`` строк для среза ``[start:stop]``.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = [
+            queryset.order_by('-pub_date', '-pk') for queryset in querysets
+        ]
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = sum(
+                queryset.count() for queryset in self.querysets
+            )
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        merged = heapq.merge(
+            *(queryset[:stop].iterator() for queryset in self.querysets),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=True,
+        )
+        return list(islice(merged, start, stop))
+
+
+def across_shards(queryset, aliases=None):
+    """``queryset`` сразу со всех шардов; без шардирования — он сам."""
+    if not enabled():
+        return queryset
+    return MergedPosts(
+        [queryset.using(alias) for alias in aliases or shard_aliases()]
+    )
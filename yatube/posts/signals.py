@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import sharding
+
+from .archive import record_post
+from .feeds import feed_keys, touch_feeds
+from .models import (
+    ArchivedPost, Comment, Follow, Group, Notification, Post, PostRevision,
+    UserStats
+)
+from .notifications import notify
+from .suggestions import graph
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_edge(sender, instance, created, **kwargs):
+    if created:
+        graph.add_edge(instance.user_id, instance.author_id)
+        UserStats.bump(instance.user_id, following_count=1)
+        UserStats.bump(instance.author_id, followers_count=1)
+        notify(instance.author_id, instance.user_id, Notification.FOLLOW)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_edge(sender, instance, **kwargs):
+    graph.remove_edge(instance.user_id, instance.author_id)
+    UserStats.bump(instance.user_id, following_count=-1)
+    UserStats.bump(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def notify_post_author(sender, instance, created, **kwargs):
+    if created:
+        notify(
+            instance.post.author_id,
+            instance.author_id,
+            Notification.COMMENT,
+            post_id=instance.post_id,
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_feeds(sender, instance, **kwargs):
+    touch_feeds(*feed_keys(instance))
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created and instance.deleted_at is None:
+        record_post(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    # Мягко удалённые посты уже вычтены в delete_post/delete_account.
+    if instance.deleted_at is None:
+        record_post(instance, -1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def delete_revisions(sender, instance, **kwargs):
+    # Версии ссылаются на пост без внешнего ключа: каскада нет.
+    PostRevision.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=Post)
+def assign_sharded_id(sender, instance, **kwargs):
+    if sharding.enabled() and instance.pk is None:
+        instance.pk = sharding.allocate_post_id(instance.author_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_save, sender=Group)
+def replicate_reference(sender, instance, raw, using, **kwargs):
+    if sharding.enabled() and using == 'default' and not raw:
+        sharding.replicate(instance)
@@ -0,0 +1,251 @@
+"""Статические sitemap.xml для постов, групп и профилей.
+
+Объекты делятся на шарды по диапазонам id (``SITEMAP_SHARD_SIZE`` на
+файл). Каждый шард пишется потоком из итератора по первичному ключу во
+временный файл рядом с ``.gz``-копией и атомарно подменяется, так что
+краулеры получают готовые файлы из ``SITEMAP_ROOT`` без Django.
+
+Повторный прогон переписывает только шарды, затронутые с прошлого
+запуска: по ``Post.updated`` и ``Post.deleted_at`` находятся изменённые
+посты, их группы и авторы, плюс шарды с новыми id. Состояние (время
+прошлого запуска и lastmod шардов для индекса) хранится в
+``.sitemap-state.json``. Жёсткие удаления в обход мягкого не видны —
+для них есть полная перестройка. При шардировании базы посты читаются
+со всех баз ``POST_SHARDS``.
+"""
+import heapq
+import json
+import os
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Max, OuterRef, Q, Subquery
+from django.urls import reverse
+from django.utils import timezone
+
+from core.compression import gzip_stream
+
+from .models import ArchivedPost, Group, Post, User
+from .sharding import shard_aliases
+from .utils import absolute_url
+
+STATE_FILE = '.sitemap-state.json'
+INDEX_FILE = 'sitemap.xml'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def post_urls(low, high):
+    """Горячие посты со всех шардов и архивные, слитые по id."""
+    managers = [Post.objects.using(alias) for alias in shard_aliases()]
+    rows = heapq.merge(*(
+        manager.filter(id__gte=low, id__lt=high)
+        .order_by('id')
+        .values_list('id', 'updated')
+        .iterator()
+        for manager in (*managers, ArchivedPost.objects)
+    ))
+    for post_id, updated in rows:
+        yield reverse('posts:post_detail', args=[post_id]), updated
+
+
+def live_posts_lastmod(field, low, high):
+    """``{значение field: lastmod}`` по живым постам со всех шардов."""
+    lastmods = {}
+    for alias in shard_aliases():
+        rows = (
+            Post.objects.using(alias)
+            .filter(**{f'{field}__gte': low, f'{field}__lt': high})
+            .order_by()
+            .values_list(field)
+            .annotate(lastmod=Max('updated'))
+        )
+        for key, lastmod in rows:
+            if key not in lastmods or lastmod > lastmods[key]:
+                lastmods[key] = lastmod
+    return lastmods
+
+
+def group_urls(low, high):
+    lastmods = live_posts_lastmod('group_id', low, high)
+    rows = (
+        Group.objects.filter(id__gte=low, id__lt=high)
+        .order_by('id')
+        .values_list('id', 'slug')
+        .iterator()
+    )
+    for group_id, slug in rows:
+        yield reverse('posts:group_list', args=[slug]), lastmods.get(group_id)
+
+
+def profile_urls(low, high):
+    """Профили активных пользователей, у которых есть посты."""
+    lastmods = live_posts_lastmod('author_id', low, high)
+    archived_lastmod = Subquery(
+        ArchivedPost.all_objects.filter(author=OuterRef('pk'))
+        .order_by('-updated')
+        .values('updated')[:1]
+    )
+    rows = (
+        User.objects.filter(id__gte=low, id__lt=high, is_active=True)
+        .annotate(archived_lastmod=archived_lastmod)
+        .order_by('id')
+        .values_list('id', 'username', 'archived_lastmod')
+        .iterator()
+    )
+    for user_id, username, archived in rows:
+        lastmod = lastmods.get(user_id, archived)
+        if lastmod is not None:
+            yield reverse('posts:profile', args=[username]), lastmod
+
+
+# Раздел: (функция URL шарда, модель, поле поста, указывающее на объект).
+SECTIONS = {
+    'posts': (post_urls, Post.all_objects, 'id'),
+    'groups': (group_urls, Group.objects, 'group_id'),
+    'profiles': (profile_urls, User.objects, 'author_id'),
+}
+
+
+def shard_name(section, number):
+    return f'sitemap-{section}-{number}.xml'
+
+
+def write_atomic(path, chunks):
+    """Пишет файл и его ``.gz``-копию через временные файлы."""
+    with open(path + '.tmp', 'w', encoding='utf-8') as output:
+        for chunk in chunks:
+            output.write(chunk)
+    with open(path + '.tmp', 'rb') as source:
+        with open(path + '.gz.tmp', 'wb') as output:
+            for chunk in gzip_stream(iter(lambda: source.read(65536), b'')):
+                output.write(chunk)
+    os.replace(path + '.gz.tmp', path + '.gz')
+    os.replace(path + '.tmp', path)
+
+
+def remove(path):
+    for name in (path, path + '.gz'):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def urlset(urls, stats):
+    yield XML_HEADER
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    for path, lastmod in urls:
+        stats['count'] += 1
+        if lastmod and (
+            stats['lastmod'] is None or lastmod > stats['lastmod']
+        ):
+            stats['lastmod'] = lastmod
+        yield f'<url><loc>{escape(absolute_url(path))}</loc>'
+        if lastmod:
+            yield f'<lastmod>{lastmod.isoformat()}</lastmod>'
+        yield '</url>\n'
+    yield '</urlset>\n'
+
+
+def sitemap_index(shards):
+    yield XML_HEADER
+    yield f'<sitemapindex xmlns="{XMLNS}">\n'
+    for name in sorted(shards):
+        yield (
+            f'<sitemap><loc>{escape(absolute_url("/" + name))}</loc>'
+            f'<lastmod>{shards[name]}</lastmod></sitemap>\n'
+        )
+    yield '</sitemapindex>\n'
+
+
+def write_shard(root, section, number, size):
+    """Переписывает шард и возвращает его lastmod или None, если он пуст."""
+    urls, _, _ = SECTIONS[section]
+    path = os.path.join(root, shard_name(section, number))
+    stats = {'count': 0, 'lastmod': None}
+    low = number * size
+    write_atomic(path, urlset(urls(low, low + size), stats))
+    if not stats['count']:
+        remove(path)
+        return None
+    return (stats['lastmod'] or timezone.now()).isoformat()
+
+
+def touched_shards(section, since, size, max_seen):
+    """Номера шардов раздела, изменившихся после ``since``.
+
+    Без ``since`` — все шарды раздела.
+    """
+    _, manager, post_field = SECTIONS[section]
+    managers = [manager]
+    if manager.model is Post:
+        managers = [manager.using(alias) for alias in shard_aliases()]
+    shards = set()
+    if since is not None:
+        for alias in shard_aliases():
+            changed = Post.all_objects.using(alias).filter(
+                Q(updated__gte=since) | Q(deleted_at__gte=since),
+                **{f'{post_field}__isnull': False},
+            )
+            shards.update(
+                changed.annotate(shard=F(post_field) / size)
+                .values_list('shard', flat=True)
+                .distinct()
+            )
+    max_id = max(
+        manager.aggregate(max_id=Max('id'))['max_id'] or -1
+        for manager in managers
+    )
+    shards.update(range((max_seen + 1) // size, max_id // size + 1))
+    return shards, max(max_id, max_seen)
+
+
+def load_state(root):
+    try:
+        with open(os.path.join(root, STATE_FILE)) as state_file:
+            return json.load(state_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_sitemaps(full=False, root=None, size=None):
+    """Обновляет sitemap и возвращает число переписанных шардов."""
+    root = root or settings.SITEMAP_ROOT
+    size = size or settings.SITEMAP_SHARD_SIZE
+    os.makedirs(root, exist_ok=True)
+    started = timezone.now()
+
+    state = load_state(root)
+    if full or state is None or state.get('size') != size:
+        state = {'size': size, 'shards': {}, 'max_ids': {}}
+        since = None
+    else:
+        since = datetime.fromisoformat(state['generated'])
+
+    rewritten = 0
+    for section in SECTIONS:
+        shards, state['max_ids'][section] = touched_shards(
+            section, since, size, state['max_ids'].get(section, -1)
+        )
+        for number in sorted(shards):
+            lastmod = write_shard(root, section, number, size)
+            name = shard_name(section, number)
+            if lastmod is None:
+                state['shards'].pop(name, None)
+            else:
+                state['shards'][name] = lastmod
+            rewritten += 1
+
+    state['generated'] = started.isoformat()
+    write_atomic(
+        os.path.join(root, INDEX_FILE), sitemap_index(state['shards'])
+    )
+    with open(os.path.join(root, STATE_FILE + '.tmp'), 'w') as state_file:
+        json.dump(state, state_file)
+    os.replace(
+        os.path.join(root, STATE_FILE + '.tmp'),
+        os.path.join(root, STATE_FILE),
+    )
+    return rewritten
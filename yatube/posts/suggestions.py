@@ -0,0 +1,221 @@
+"""Подсказки «На кого подписаться».
+
+Граф подписок держится в памяти процесса: для каждого пользователя —
+отсортированный ``array`` с id авторов, на которых он подписан, и для
+каждого автора — набор групп, в которых он публикуется. Индекс
+перестраивается целиком раз в ``SUGGESTIONS_REBUILD_INTERVAL`` секунд
+в фоновом потоке (запросы тем временем читают старый индекс) и
+точечно правится сигналами на подписку и отписку. Правки, пришедшие во
+время перестройки, повторяются на новом индексе перед подменой.
+
+Готовые подсказки запоминаются, не больше ``SUGGESTIONS_CACHE_SIZE``
+пользователей. Подписка меняет подсказки не только подписчика, но и
+всех, кто подписан на него, поэтому любая правка графа сбрасывает их
+все.
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Follow, Post
+from .sharding import shard_aliases
+
+CO_FOLLOW_WEIGHT = 2
+SHARED_GROUP_WEIGHT = 1
+
+
+class FollowGraph:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.following = {}
+        self.author_groups = {}
+        self.group_authors = {}
+        self.suggestions = {}
+        self.built_at = None
+        self.rebuilding = False
+        # Растёт с каждой правкой: расчёт по старому графу не запоминается.
+        self.version = 0
+        # Правки графа во время перестройки: (добавлена ли, кто, на кого).
+        self.pending = None
+
+    def build(self):
+        with self.lock:
+            self.pending = []
+        following = defaultdict(lambda: array('l'))
+        edges = (
+            Follow.objects.order_by('user_id', 'author_id')
+            .values_list('user_id', 'author_id')
+            .iterator()
+        )
+        for user_id, author_id in edges:
+            following[user_id].append(author_id)
+
+        author_groups = defaultdict(set)
+        group_authors = defaultdict(lambda: array('l'))
+        for alias in shard_aliases():
+            activity = (
+                Post.objects.using(alias).filter(group__isnull=False)
+                .order_by()
+                .values_list('author_id', 'group_id')
+                .distinct()
+                .iterator()
+            )
+            for author_id, group_id in activity:
+                author_groups[author_id].add(group_id)
+                group_authors[group_id].append(author_id)
+
+        with self.lock:
+            for added, user_id, author_id in self.pending:
+                patch_edge(following, added, user_id, author_id)
+            self.pending = None
+            self.following = dict(following)
+            self.author_groups = {
+                author_id: frozenset(groups)
+                for author_id, groups in author_groups.items()
+            }
+            self.group_authors = dict(group_authors)
+            self.suggestions = {}
+            self.version += 1
+            self.built_at = time.monotonic()
+
+    def rebuild(self):
+        try:
+            self.build()
+        finally:
+            # Соединения этого потока больше никому не достанутся.
+            connections.close_all()
+            self.rebuilding = False
+
+    def ensure_fresh(self):
+        """Запускает перестройку устаревшего индекса.
+
+        В фоне (``SUGGESTIONS_REBUILD_IN_BACKGROUND``) запрос её не ждёт:
+        до первой готовой сборки подсказок просто нет.
+        """
+        if (
+            self.built_at is not None
+            and time.monotonic() - self.built_at
+            <= settings.SUGGESTIONS_REBUILD_INTERVAL
+        ):
+            return
+        if not settings.SUGGESTIONS_REBUILD_IN_BACKGROUND:
+            self.build()
+            return
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(
+            target=self.rebuild, name='suggestions-rebuild', daemon=True
+        ).start()
+
+    def change_edge(self, added, user_id, author_id):
+        with self.lock:
+            patch_edge(self.following, added, user_id, author_id)
+            if self.pending is not None:
+                self.pending.append((added, user_id, author_id))
+            self.suggestions = {}
+            self.version += 1
+
+    def add_edge(self, user_id, author_id):
+        self.change_edge(True, user_id, author_id)
+
+    def remove_edge(self, user_id, author_id):
+        self.change_edge(False, user_id, author_id)
+
+    def suggest(self, user_id):
+        """Возвращает id авторов, отсортированные по убыванию оценки.
+
+        Результат запоминается до перестройки индекса или до любой
+        правки графа, поэтому повторный запрос — это чтение из словаря.
+        """
+        suggestions = self.suggestions.get(user_id)
+        if suggestions is None:
+            version = self.version
+            suggestions = self.compute(user_id)
+            with self.lock:
+                if version != self.version:
+                    return suggestions
+                if len(self.suggestions) >= settings.SUGGESTIONS_CACHE_SIZE:
+                    # Вытесняем самую старую запись.
+                    del self.suggestions[next(iter(self.suggestions))]
+                self.suggestions[user_id] = suggestions
+        return suggestions
+
+    def compute(self, user_id):
+        """Оценка — удвоенное число ваших подписок, подписанных на автора,
+        плюс число общих групп, в которых вы оба публикуетесь. Обход
+        ограничен ``SUGGESTIONS_MAX_EXPANSION`` рёбрами, чтобы время
+        расчёта не зависело от размера графа.
+        """
+        following = self.following
+        followed = following.get(user_id, ())
+        excluded = set(followed)
+        excluded.add(user_id)
+
+        budget = settings.SUGGESTIONS_MAX_EXPANSION
+        co_follows = Counter()
+        for followee in followed:
+            if budget <= 0:
+                break
+            candidates = following.get(followee, array('l'))[:budget]
+            budget -= len(candidates)
+            co_follows.update(candidates)
+
+        shared_groups = Counter()
+        for group_id in self.author_groups.get(user_id, ()):
+            if budget <= 0:
+                break
+            candidates = self.group_authors.get(group_id, array('l'))[:budget]
+            budget -= len(candidates)
+            shared_groups.update(candidates)
+
+        scores = {
+            candidate: CO_FOLLOW_WEIGHT * co_follows[candidate]
+            + SHARED_GROUP_WEIGHT * shared_groups[candidate]
+            for candidate in co_follows.keys() | shared_groups.keys()
+            if candidate not in excluded
+        }
+        return heapq.nlargest(
+            settings.SUGGESTIONS_LIMIT,
+            scores,
+            key=lambda candidate: (scores[candidate], -candidate),
+        )
+
+
+def patch_edge(following, added, user_id, author_id):
+    """Добавляет или убирает ребро в отсортированном списке подписок."""
+    if added:
+        authors = following.setdefault(user_id, array('l'))
+    else:
+        authors = following.get(user_id)
+        if not authors:
+            return
+    index = bisect_left(authors, author_id)
+    present = index < len(authors) and authors[index] == author_id
+    if added and not present:
+        insort(authors, author_id)
+    elif not added and present:
+        del authors[index]
+
+
+graph = FollowGraph()
+
+
+def suggested_authors(user):
+    """Пользователи-подсказки для ``user`` в порядке убывания оценки."""
+    if not user.is_authenticated:
+        return []
+    graph.ensure_fresh()
+    author_ids = graph.suggest(user.pk)
+    authors = user.__class__.objects.filter(is_active=True).in_bulk(
+        author_ids
+    )
+    return [authors[pk] for pk in author_ids if pk in authors]
@@ -0,0 +1,152 @@
+"""Хештеги и упоминания в тексте постов.
+
+Хештеги сохраняются в ``PostTag`` при создании и правке поста, лента тега
+читается по индексу (tag, pub_date). Упоминания не хранятся: при выводе
+имена из текстов страницы проверяются одним запросом, и ссылки на профиль
+получают только существующие пользователи.
+"""
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.html import escape, format_html
+from django.utils.text import normalize_newlines
+
+from .models import Post, PostTag, Tag, User
+from .sharding import copy_references, shard_aliases
+
+HASHTAG_RE = re.compile(r'(?<![\w&#])#(\w{1,64})(?!\w)')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{0,149}\w)')
+
+
+def extract_hashtags(text):
+    return {name.lower() for name in HASHTAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    return set(MENTION_RE.findall(text))
+
+
+def tag_ids(names):
+    """``{имя: id}`` для тегов ``names``, недостающие создаются."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    ids = dict(
+        Tag.objects.filter(name__in=names).values_list('name', 'id')
+    )
+    copy_references(
+        [Tag(id=tag_id, name=name) for name, tag_id in ids.items()]
+    )
+    return ids
+
+
+def sync_tags(post):
+    """Приводит теги поста в соответствие с его текстом."""
+    wanted = extract_hashtags(post.text)
+    current = dict(
+        post.post_tags.values_list('tag__name', 'id')
+    )
+    stale = [pk for name, pk in current.items() if name not in wanted]
+    post_tags = PostTag.objects.using(post._state.db)
+    if stale:
+        post_tags.filter(pk__in=stale).delete()
+    ids = tag_ids(wanted - current.keys())
+    post_tags.bulk_create(
+        PostTag(post=post, tag_id=tag_id, pub_date=post.pub_date)
+        for tag_id in ids.values()
+    )
+
+
+def reindex_tags(chunk_size=None):
+    """Заново извлекает теги всех постов, пачками по ``chunk_size``.
+
+    Посты каждого шарда читаются потоком, каждая пачка пересобирается в
+    своей транзакции. Возвращает число обработанных постов.
+    """
+    chunk_size = chunk_size or settings.TAGS_CHUNK_SIZE
+    total = 0
+    for alias in shard_aliases():
+        rows = (
+            Post.all_objects.using(alias).order_by('pk')
+            .values_list('pk', 'text', 'pub_date')
+            .iterator(chunk_size=chunk_size)
+        )
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                total += reindex_chunk(chunk, alias)
+                chunk = []
+        if chunk:
+            total += reindex_chunk(chunk, alias)
+    return total
+
+
+def reindex_chunk(rows, using='default'):
+    names = {pk: extract_hashtags(text) for pk, text, _ in rows}
+    post_tags = PostTag.objects.using(using)
+    with transaction.atomic(using=using):
+        post_tags.filter(post_id__in=names).delete()
+        ids = tag_ids(set().union(*names.values()))
+        post_tags.bulk_create(
+            PostTag(post_id=pk, tag_id=ids[name], pub_date=pub_date)
+            for pk, _, pub_date in rows
+            for name in names[pk]
+        )
+    return len(rows)
+
+
+class MentionResolver:
+    """Какие из упомянутых имён принадлежат активным пользователям.
+
+    Проверенные имена запоминаются, поэтому повторный вызов для тех же
+    текстов не делает запросов.
+    """
+
+    def __init__(self):
+        self.checked = set()
+        self.existing = set()
+
+    def resolve(self, texts):
+        names = set()
+        for text in texts:
+            names |= extract_mentions(text)
+        names -= self.checked
+        if names:
+            self.existing.update(
+                User.objects.filter(username__in=names, is_active=True)
+                .values_list('username', flat=True)
+            )
+            self.checked |= names
+        return self.existing
+
+
+def link_tag(match):
+    return format_html(
+        '<a href="{}">#{}</a>',
+        reverse('posts:tag', args=[match.group(1).lower()]),
+        match.group(1),
+    )
+
+
+def linkify(text, usernames):
+    """HTML текста с переносами строк и ссылками на теги и профили."""
+    def link_mention(match):
+        username = match.group(1)
+        if username not in usernames:
+            return match.group(0)
+        return format_html(
+            '<a href="{}">@{}</a>',
+            reverse('posts:profile', args=[username]),
+            username,
+        )
+
+    # escape не порождает '@', а '#' появляется только после '&',
+    # поэтому регулярки по экранированному тексту находят то же самое.
+    html = HASHTAG_RE.sub(link_tag, escape(text))
+    html = MENTION_RE.sub(link_mention, html)
+    return normalize_newlines(html).replace('\n', '<br>')
@@ -0,0 +1,23 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..tags import MentionResolver, linkify
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_text(context, post):
+    """Текст поста со ссылками на теги и профили упомянутых.
+
+    При первом вызове за рендер имена из всех постов ``page_obj``
+    проверяются одним запросом; резолвер живёт на объекте контекста,
+    общем для всех include.
+    """
+    resolver = getattr(context, 'mention_resolver', None)
+    if resolver is None:
+        resolver = context.mention_resolver = MentionResolver()
+        page_obj = context.get('page_obj') or ()
+        resolver.resolve(page_post.text for page_post in page_obj)
+    usernames = resolver.resolve([post.text])
+    return mark_safe(linkify(post.text, usernames))
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_months
+from ..deletion import delete_post
+from ..models import Group, Post, User
+
+
+def local_datetime(year, month, day=15):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def counts(self, feed):
+        return {
+            (day.year, day.month): count
+            for months in archive_months(feed).values()
+            for day, count in months
+        }
+
+    def test_counters_follow_create_move_and_delete(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        month = (timezone.localtime().year, timezone.localtime().month)
+        self.assertEqual(self.counts('index'), {month: 1})
+        self.assertEqual(self.counts(f'group:{self.group.pk}'), {month: 1})
+        self.assertEqual(
+            self.counts(f'author:{self.author.pk}'), {month: 1}
+        )
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'group': self.other_group.pk},
+        )
+        self.assertEqual(self.counts(f'group:{self.group.pk}'), {})
+        self.assertEqual(
+            self.counts(f'group:{self.other_group.pk}'), {month: 1}
+        )
+
+        delete_post(post)
+        self.assertEqual(self.counts('index'), {})
+        self.assertEqual(self.counts(f'author:{self.author.pk}'), {})
+
+    def test_month_page_lists_only_that_month(self):
+        march = Post.objects.create(
+            text='Мартовский пост', author=self.author, group=self.group
+        )
+        april = Post.objects.create(
+            text='Апрельский пост', author=self.author, group=self.group
+        )
+        Post.objects.filter(pk=march.pk).update(
+            pub_date=local_datetime(2021, 3, 31)
+        )
+        Post.objects.filter(pk=april.pk).update(
+            pub_date=local_datetime(2021, 4, 1)
+        )
+        urls = (
+            reverse('posts:archive', args=[2021, 3]),
+            reverse('posts:group_archive', args=['group', 2021, 3]),
+            reverse('posts:profile_archive', args=['author', 2021, 3]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Мартовский пост')
+                self.assertNotContains(response, 'Апрельский пост')
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:archive', args=[2021, 13])
+            ).status_code,
+            404,
+        )
+
+    def test_navigation_does_not_group_by_dates(self):
+        Post.objects.create(text='Пост', author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:archive', args=[2021, 3]))
+        self.assertFalse(
+            any('GROUP BY' in query['sql'] for query in queries)
+        )
@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..deletion import purge_deleted
+from ..models import (
+    AccountDeletion, Comment, Follow, Notification, Post, User, UserStats
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_GC_GRACE=0)
+class DeletionTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(
+            text='Пост под удаление',
+            author=self.author,
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.other_post = Post.objects.create(
+            text='Пост читателя', author=self.reader
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Ответ'
+        )
+        Comment.objects.create(
+            post=self.other_post, author=self.author, text='Комментарий автора'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_post_delete_hides_post_and_purges_feed_cache(self):
+        """Удалённый пост сразу пропадает из ленты и со своей страницы."""
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Пост под удаление'
+        )
+        self.author_client.post(
+            reverse('posts:post_delete', args=[self.post.pk])
+        )
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'Пост под удаление'
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+
+    def test_only_author_can_delete_post(self):
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.post(
+            reverse('posts:post_delete', args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_purge_removes_comments_and_image(self):
+        """Очистка удаляет комментарии, уведомления и файл картинки."""
+        image_path = self.post.image.path
+        self.author_client.post(
+            reverse('posts:post_delete', args=[self.post.pk])
+        )
+        self.assertEqual(purge_deleted(chunk_size=1), (1, 0))
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.post.pk).exists())
+        self.assertFalse(
+            Notification.objects.filter(post_id=self.post.pk).exists()
+        )
+        self.assertFalse(os.path.exists(image_path))
+
+    def test_account_delete_hides_content_and_updates_counters(self):
+        """Аккаунт сразу скрыт, счётчики собеседников уже поправлены."""
+        self.author_client.post(reverse('users:account_delete'))
+
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(
+            self.client.get(
+                reverse('posts:post_detail', args=[self.other_post.pk])
+            ),
+            'Комментарий автора',
+        )
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (0, 0)
+        )
+
+    def test_account_purge_keeps_counters(self):
+        """Фоновая очистка не уменьшает счётчики второй раз."""
+        self.author_client.post(reverse('users:account_delete'))
+        call_command('purge_deleted', chunk_size=1, stdout=StringIO())
+
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(AccountDeletion.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(list(Post.all_objects.all()), [self.other_post])
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (0, 0)
+        )
+
+    def test_follow_views_ignore_deleted_account(self):
+        """Подписка на удалённый аккаунт и отписка от него дают 404."""
+        self.author_client.post(reverse('users:account_delete'))
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        for name in ('profile_follow', 'profile_unfollow'):
+            with self.subTest(name=name):
+                response = reader_client.get(
+                    reverse(f'posts:{name}', args=[self.author.username])
+                )
+                self.assertEqual(response.status_code, 404)
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (0, 0)
+        )
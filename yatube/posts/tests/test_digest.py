@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..digest import collect_posts, newest_posts, send_digests
+from ..models import DigestSubscription, Follow, Post, User
+
+
+class DigestTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader{i}', email=f'reader{i}@example.com'
+            )
+            for i in range(5)
+        ]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+            DigestSubscription.objects.create(user=reader)
+        cls.post = Post.objects.create(text='Свежий пост', author=cls.author)
+        old_post = Post.objects.create(text='Старый пост', author=cls.author)
+        Post.objects.filter(pk=old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+
+    def test_digest_lists_only_new_posts(self):
+        """В дайджест попадают только посты за сутки."""
+        processed, sent, _ = send_digests(chunk_size=2)
+        self.assertEqual((processed, sent), (5, 5))
+        self.assertIn('Свежий пост', mail.outbox[0].body)
+        self.assertNotIn('Старый пост', mail.outbox[0].body)
+
+    def test_period_starts_at_last_sent(self):
+        """После пропущенных запусков приходят посты за весь перерыв."""
+        DigestSubscription.objects.filter(user=self.readers[0]).update(
+            last_sent=timezone.now() - timedelta(days=4)
+        )
+        send_digests()
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        self.assertIn('Старый пост', bodies['reader0@example.com'])
+        self.assertNotIn('Старый пост', bodies['reader1@example.com'])
+
+    @override_settings(DIGEST_MAX_POSTS=2)
+    def test_long_idle_subscriber_gets_newest_posts(self):
+        """Давно не получавший дайджест подписчик не тянет всю историю."""
+        now = timezone.now()
+        for days in range(1, 6):
+            post = Post.objects.create(text=f'Пост {days}', author=self.author)
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(days=days, minutes=1)
+            )
+        since = now - timedelta(days=30)
+        self.assertEqual(
+            newest_posts('default', [self.author.pk], since, now).count(), 2
+        )
+        idle, recent = self.readers[:2]
+        posts = collect_posts(
+            {
+                idle.pk: since,
+                recent.pk: now - timedelta(days=2),
+            },
+            now,
+        )
+        self.assertEqual(
+            [post['text'] for post in posts[idle.pk]],
+            ['Свежий пост', 'Пост 1'],
+        )
+        self.assertEqual(
+            [post['text'] for post in posts[recent.pk]],
+            ['Свежий пост', 'Пост 1'],
+        )
+
+    def test_queries_do_not_grow_with_users(self):
+        """На пачку подписчиков — постоянное число запросов."""
+        with self.assertNumQueries(4 * 3 + 1):
+            send_digests(chunk_size=2)
+
+    def test_rerun_skips_processed_users(self):
+        """Повторный запуск не шлёт письма второй раз."""
+        send_digests()
+        mail.outbox.clear()
+        call_command('send_digest', verbosity=0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_opt_in_and_out(self):
+        """Пользователь сам включает и выключает дайджест."""
+        client = Client()
+        client.force_login(self.author)
+        client.get(reverse('posts:digest_subscribe'))
+        self.assertTrue(
+            DigestSubscription.objects.filter(user=self.author).exists()
+        )
+        client.get(reverse('posts:digest_unsubscribe'))
+        self.assertFalse(
+            DigestSubscription.objects.filter(user=self.author).exists()
+        )
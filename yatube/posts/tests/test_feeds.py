@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..deletion import delete_post
+from ..models import Group, Post, User
+
+
+class FeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Первый пост в ленте', author=self.author, group=self.group
+        )
+
+    def test_feeds_list_posts(self):
+        urls = (
+            reverse('posts:index_feed', args=['rss']),
+            reverse('posts:index_feed', args=['atom']),
+            reverse('posts:group_feed', args=['group', 'rss']),
+            reverse('posts:profile_feed', args=['author', 'atom']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Первый пост в ленте')
+                self.assertTrue(response['ETag'].startswith('"'))
+                self.assertIn('Last-Modified', response)
+        self.assertEqual(
+            self.client.get('/feed/json/').status_code, 404
+        )
+
+    def test_conditional_request_skips_post_queries(self):
+        """Совпавший ETag даёт 304 без запросов к постам."""
+        url = reverse('posts:group_feed', args=['group', 'atom'])
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            any('posts_post' in query['sql'] for query in queries)
+        )
+
+    def test_write_changes_version(self):
+        """Новый и удалённый пост сразу меняют ленту и её ETag."""
+        url = reverse('posts:profile_feed', args=['author', 'rss'])
+        client = Client()
+        etag = client.get(url)['ETag']
+
+        Post.objects.create(text='Второй пост', author=self.author)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Второй пост')
+
+        delete_post(self.post)
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertNotContains(response, 'Первый пост в ленте')
+
+    @override_settings(FEED_STAMP_TIMEOUT=0)
+    def test_stamp_expires_for_writes_from_other_workers(self):
+        """Запись мимо кэша этого процесса видна после истечения штампа."""
+        url = reverse('posts:index_feed', args=['rss'])
+        # Штамп из setUp записан ещё с обычным сроком.
+        cache.clear()
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Правка из другого воркера', updated=timezone.now()
+        )
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Правка из другого воркера')
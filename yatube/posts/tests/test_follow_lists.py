@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..deletion import delete_account
+from ..models import Follow, User, UserStats
+
+
+class FollowListsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.fans = [
+            User.objects.create_user(username=f'fan{i}') for i in range(12)
+        ]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.author)
+        Follow.objects.create(user=cls.viewer, author=cls.fans[-1])
+        Follow.objects.create(user=cls.author, author=cls.viewer)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.viewer)
+        cache.clear()
+
+    def test_counters_follow_follow_and_unfollow(self):
+        """Счётчики меняются вместе с подписками."""
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (12, 1)
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'fan11'})
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.viewer).following_count, 0
+        )
+
+    def test_follow_is_unique(self):
+        """Повторная подписка не создаёт вторую строку."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.viewer, author=self.fans[-1])
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'fan11'})
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.viewer).following_count, 1
+        )
+
+    def test_repeated_account_deletion_keeps_counters(self):
+        """Повторное удаление аккаунта не вычитает счётчики ещё раз."""
+        delete_account(self.fans[0])
+        delete_account(self.fans[0])
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 11
+        )
+
+    def test_followers_cursor_pages(self):
+        """Подписчики листаются курсором от новых к старым."""
+        url = reverse('posts:followers', kwargs={'username': 'author'})
+        response = self.authorized_client.get(url)
+        people = [person for person, _ in response.context['people']]
+        self.assertEqual(people, self.fans[::-1][:10])
+        self.assertEqual(response.context['stats'].followers_count, 12)
+
+        response = self.authorized_client.get(
+            url, {'after': response.context['next_cursor']}
+        )
+        people = [person for person, _ in response.context['people']]
+        self.assertEqual(people, self.fans[1::-1])
+        self.assertIsNone(response.context['next_cursor'])
+
+    # Пользователь запроса читается из общего кэша, как в продакшене.
+    @mock.patch('core.backends.PROCESS_LOCAL_CACHES', ())
+    def test_already_following_flag_is_one_query(self):
+        """Флаг «уже подписан» ставится одним запросом на страницу."""
+        url = reverse('posts:followers', kwargs={'username': 'author'})
+        self.authorized_client.get(url)
+        with self.assertNumQueries(3):
+            response = self.authorized_client.get(url)
+        flags = dict(response.context['people'])
+        self.assertTrue(flags[self.fans[-1]])
+        self.assertFalse(flags[self.fans[-2]])
+
+    def test_following_page(self):
+        """Страница подписок показывает авторов пользователя."""
+        response = self.authorized_client.get(
+            reverse('posts:following', kwargs={'username': 'author'})
+        )
+        self.assertEqual(
+            response.context['people'], [(self.viewer, False)]
+        )
+
+    def test_inactive_user_lists_are_not_found(self):
+        """Списки подписок удалённого аккаунта отдают 404."""
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        for name in ('posts:followers', 'posts:following'):
+            with self.subTest(name=name):
+                response = self.authorized_client.get(
+                    reverse(name, kwargs={'username': 'author'})
+                )
+                self.assertEqual(response.status_code, 404)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -82,8 +83,10 @@ class PostsCreateFormTests(TestCase):
         self.assertEqual(first_object.text, form_data['text'])
         self.assertEqual(first_object.group.id, self.group.id)
 
-        image = uploaded.name
-        self.assertEqual(first_object.image, f'posts/{image}')
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(
+            first_object.image, f'posts/{digest[:2]}/{digest}.gif'
+        )
 
     def test_edit_post(self):
         """Валидная форма изменяет запись в Post."""
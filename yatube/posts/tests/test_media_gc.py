@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.default import kvstore
+
+from ..media_gc import collect_media_garbage
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_GC_GRACE=0)
+class MediaGarbageTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=author)
+        self.post.image.save('old.gif', ContentFile(SMALL_GIF))
+        self.replaced_name = self.post.image.name
+        self.replaced_thumbnail = get_thumbnail(self.post.image, '10x10')
+
+        self.post.image.save('new.gif', ContentFile(SMALL_GIF + b'\x00'))
+        self.live_thumbnail = get_thumbnail(self.post.image, '10x10')
+
+    def test_dry_run_reports_without_deleting(self):
+        out = StringIO()
+        call_command('collect_media_garbage', dry_run=True, stdout=out)
+        self.assertIn('Найдено записей sorl: 1, файлов: 2', out.getvalue())
+        self.assertTrue(default_storage.exists(self.replaced_name))
+
+    def test_orphans_are_deleted_and_live_files_kept(self):
+        """Удаляются заменённая картинка, её миниатюра и запись sorl."""
+        sources, files, _ = collect_media_garbage(rate=0)
+
+        self.assertEqual(sources, 1)
+        self.assertGreaterEqual(files, 1)
+        self.assertFalse(default_storage.exists(self.replaced_name))
+        self.assertFalse(
+            default_storage.exists(self.replaced_thumbnail.name)
+        )
+        self.assertTrue(default_storage.exists(self.post.image.name))
+        self.assertTrue(default_storage.exists(self.live_thumbnail.name))
+        self.assertIsNotNone(kvstore.get(self.live_thumbnail))
+        self.assertEqual(collect_media_garbage(rate=0), (0, 0, 0))
+
+    @override_settings(MEDIA_GC_GRACE=60 * 60)
+    def test_fresh_files_are_kept(self):
+        """Недавно записанные файлы не трогаются даже без ссылок."""
+        collect_media_garbage(rate=0)
+        self.assertTrue(default_storage.exists(self.replaced_name))
+        self.assertTrue(default_storage.exists(self.live_thumbnail.name))
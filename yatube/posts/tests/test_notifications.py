@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Notification, Post, User, UserStats
+from ..notifications import mark_read, unread_cache_key
+
+
+class NotificationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def comment(self, text='Комментарий'):
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': text},
+        )
+
+    def test_repeated_comments_collapse(self):
+        """Серия комментариев к посту даёт одно уведомление."""
+        for _ in range(3):
+            self.comment()
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.kind, Notification.COMMENT)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).unread_notifications, 1
+        )
+
+    def test_new_follower_is_notified(self):
+        """Новый подписчик создаёт уведомление."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertTrue(
+            Notification.objects.filter(
+                recipient=self.author,
+                actor=self.reader,
+                kind=Notification.FOLLOW,
+            ).exists()
+        )
+
+    def test_own_comment_is_not_notified(self):
+        """Свой комментарий к своему посту не уведомляет."""
+        self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'},
+        )
+        self.assertFalse(Notification.objects.exists())
+
+    def test_badge_is_cached_and_inbox_marks_read(self):
+        """Счётчик в шапке берётся из кэша и сбрасывается во входящих."""
+        self.comment()
+        response = self.author_client.get(reverse('about:author'))
+        self.assertEqual(response.context['unread_notifications'], 1)
+        self.assertEqual(cache.get(unread_cache_key(self.author.pk)), 1)
+
+        response = self.author_client.get(reverse('posts:notifications'))
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertFalse(
+            Notification.objects.filter(is_read=False).exists()
+        )
+        response = self.author_client.get(reverse('about:author'))
+        self.assertEqual(response.context['unread_notifications'], 0)
+
+    def test_inbox_marks_only_shown_notifications(self):
+        """Прочитанными становятся только показанные уведомления."""
+        now = timezone.now()
+        for minutes in range(settings.NUMBER_OF_POSTS_PER_PAGE + 1):
+            Notification.objects.create(
+                recipient=self.author, actor=self.reader,
+                kind=Notification.FOLLOW,
+                updated=now - timedelta(minutes=minutes),
+            )
+        UserStats.bump(
+            self.author.pk,
+            unread_notifications=settings.NUMBER_OF_POSTS_PER_PAGE + 1,
+        )
+        self.author_client.get(reverse('posts:notifications'))
+        self.assertEqual(
+            Notification.objects.filter(is_read=False).count(), 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).unread_notifications, 1
+        )
+
+        unread = Notification.objects.get(is_read=False)
+        mark_read(self.author, [unread], now - timedelta(days=1))
+        unread.refresh_from_db()
+        self.assertFalse(unread.is_read)
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..deletion import delete_account, purge_deleted
+from ..models import (
+    ArchivedComment, ArchivedPost, Comment, Group, Post, PostRevision, User
+)
+from ..partitions import archive_old_posts
+from ..revisions import record_revision
+
+
+class PartitionTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.old = Post.objects.create(
+            text='Старый пост', author=self.author, group=self.group
+        )
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        self.comment = Comment.objects.create(
+            post=self.old, author=self.reader, text='Старый комментарий'
+        )
+        self.new = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+
+    def test_old_posts_move_with_comments(self):
+        call_command('archive_posts', stdout=StringIO())
+
+        self.assertEqual(
+            list(Post.objects.values_list('pk', flat=True)), [self.new.pk]
+        )
+        archived = ArchivedPost.objects.get()
+        self.assertEqual(archived.pk, self.old.pk)
+        self.assertEqual(archived.text, 'Старый пост')
+        self.assertEqual(
+            ArchivedComment.objects.get().pk, self.comment.pk
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(archive_old_posts(), (0, 0))
+
+    def test_pages_read_both_tables(self):
+        archive_old_posts()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk])
+        )
+        self.assertContains(response, 'Старый пост')
+        self.assertContains(response, 'Старый комментарий')
+
+        response = self.client.get(
+            reverse('posts:profile', args=['author'])
+        )
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Новый пост', 'Старый пост'],
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+        month = timezone.localtime(
+            ArchivedPost.objects.get().pub_date
+        )
+        response = self.client.get(reverse(
+            'posts:group_archive', args=['group', month.year, month.month]
+        ))
+        self.assertContains(response, 'Старый пост')
+
+    def test_archived_post_is_read_only(self):
+        archive_old_posts()
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(
+            reverse('posts:post_edit', args=[self.old.pk]),
+            {'text': 'Правка'},
+        )
+        self.assertEqual(response.status_code, 404)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.old.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_account_hides_and_purges_archive(self):
+        record_revision(self.old, 'Удалённый текст', self.old.updated)
+        archive_old_posts()
+        delete_account(self.author)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:post_detail', args=[self.old.pk])
+            ).status_code,
+            404,
+        )
+        purge_deleted()
+        self.assertFalse(ArchivedPost.all_objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
+        self.assertFalse(PostRevision.objects.exists())
+
+    def test_post_delete_removes_revisions(self):
+        """Версии удаляются вместе с постом, хоть каскада и нет."""
+        record_revision(self.new, 'Черновик', self.new.updated)
+        Post.all_objects.filter(pk=self.new.pk).delete()
+        self.assertFalse(PostRevision.objects.exists())
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, PostRevision, User
+from ..revisions import apply_delta, make_delta, revision_text
+
+
+@override_settings(REVISION_SNAPSHOT_INTERVAL=3)
+class RevisionTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Версия 0: ' + 'длинный текст. ' * 49 + 'конец.',
+            author=self.author,
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def edit(self, text):
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[self.post.pk]), {'text': text}
+        )
+
+    def test_delta_round_trip(self):
+        old = 'Мама мыла раму'
+        new = 'Мама мыла раму, а папа — окно'
+        self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+    def test_every_version_is_reconstructed(self):
+        texts = [self.post.text]
+        for i in range(1, 6):
+            texts.append(texts[-1].replace(f'Версия {i - 1}', f'Версия {i}'))
+            self.edit(texts[-1])
+        self.edit(texts[-1])
+
+        revisions = list(
+            self.post.revisions.order_by('number')
+            .values_list('number', 'is_snapshot')
+        )
+        self.assertEqual(
+            revisions,
+            [(1, True), (2, False), (3, False), (4, True),
+             (5, False), (6, False)],
+        )
+        delta = PostRevision.objects.get(post=self.post, number=2)
+        self.assertLess(len(delta.data), len(texts[1]) // 10)
+        for number, text in enumerate(texts, start=1):
+            with self.subTest(number=number):
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(revision_text(self.post, number), text)
+                self.assertEqual(len(queries), 1)
+        self.assertIsNone(revision_text(self.post, 7))
+
+    def test_history_view_is_for_author_only(self):
+        self.edit('Новый текст')
+        url = reverse('posts:post_history', args=[self.post.pk])
+        response = self.authorized_client.get(url, {'version': 1})
+        self.assertContains(response, 'Версия 0')
+        self.assertContains(response, 'Версия 2')
+        self.assertEqual(
+            self.authorized_client.get(url, {'version': 9}).status_code, 404
+        )
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertEqual(reader.get(url).status_code, 404)
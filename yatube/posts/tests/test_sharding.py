@@ -0,0 +1,260 @@
+import os
+import tempfile
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    ArchivedPost, Comment, DigestSubscription, Follow, Group, Notification,
+    Post, PostRevision, PostTag, TrendingScore, User
+)
+from ..deletion import delete_account, purge_deleted
+from ..digest import send_digests
+from ..media_gc import MediaCollector
+from ..partitions import archive_old_posts
+from ..sharding import shard_for_author, shard_for_post
+from ..sitemaps import build_sitemaps, shard_name
+from ..tags import reindex_tags
+from ..trending import record_activity, rollup
+
+SHARDS = ['shard_1', 'shard_2']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first = User.objects.create_user(username='first')
+        cls.second = User.objects.create_user(username='second')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.posts = []
+        for i in range(6):
+            author = (self.first, self.second)[i % 2]
+            self.posts.append(Post.objects.create(
+                text=f'Пост {i}', author=author, group=self.group
+            ))
+
+    def test_posts_land_on_author_shards(self):
+        self.assertNotEqual(
+            shard_for_author(self.first.pk), shard_for_author(self.second.pk)
+        )
+        for post in self.posts:
+            shard = shard_for_author(post.author_id)
+            self.assertEqual(shard_for_post(post.pk), shard)
+            self.assertTrue(
+                Post.objects.using(shard).filter(pk=post.pk).exists()
+            )
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertEqual(
+            len({post.pk for post in self.posts}), len(self.posts)
+        )
+
+    def test_references_are_copied_to_every_shard(self):
+        for shard in SHARDS:
+            self.assertEqual(User.objects.using(shard).count(), 3)
+            self.assertTrue(
+                Group.objects.using(shard).filter(slug='group').exists()
+            )
+
+    def test_feeds_merge_shards(self):
+        newest_first = [post.text for post in reversed(self.posts)]
+        Follow.objects.create(user=self.reader, author=self.second)
+        client = Client()
+        client.force_login(self.reader)
+        for url, expected in (
+            (reverse('posts:index'), newest_first),
+            (reverse('posts:group_list', args=['group']), newest_first),
+            (reverse('posts:follow_index'), ['Пост 5', 'Пост 3', 'Пост 1']),
+        ):
+            with self.subTest(url=url):
+                page_obj = client.get(url).context['page_obj']
+                self.assertEqual(
+                    [post.text for post in page_obj], expected
+                )
+                self.assertEqual(page_obj.paginator.count, len(expected))
+
+    def test_detail_edit_and_comment_use_post_shard(self):
+        post = self.posts[1]
+        shard = shard_for_post(post.pk)
+        client = Client()
+        client.force_login(self.second)
+        client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Правка с #тегом', 'group': self.group.pk},
+        )
+        client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(
+            Post.objects.using(shard).get(pk=post.pk).text,
+            'Правка с #тегом',
+        )
+        self.assertEqual(Comment.objects.using(shard).count(), 1)
+        self.assertEqual(PostTag.objects.using(shard).count(), 1)
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, 'Правка с')
+        self.assertContains(response, 'Комментарий')
+        response = self.client.get(reverse('posts:tag', args=['тегом']))
+        self.assertContains(response, 'Правка с')
+        response = self.client.get(reverse('posts:profile', args=['second']))
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+    def test_unknown_ids_are_not_found(self):
+        """id вне списка шардов даёт 404, а архивный пост находится."""
+        client = Client()
+        client.force_login(self.second)
+        for name in ('post_detail', 'post_edit', 'post_history'):
+            with self.subTest(name=name):
+                response = client.get(reverse(f'posts:{name}', args=[5]))
+                self.assertEqual(response.status_code, 404)
+        response = client.post(
+            reverse('posts:add_comment', args=[5]), {'text': 'Нет'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        ArchivedPost.objects.create(
+            id=5, text='Архивный', author=self.second,
+            pub_date=timezone.now(), updated=timezone.now(),
+        )
+        response = client.get(reverse('posts:post_detail', args=[5]))
+        self.assertContains(response, 'Архивный')
+
+    def test_purge_cleans_every_shard(self):
+        """Очистка удаляет посты, комментарии и копии аккаунта на шардах."""
+        Comment.objects.create(
+            post=self.posts[0], author=self.second, text='С чужого шарда'
+        )
+        delete_account(self.second)
+        self.assertEqual(purge_deleted(), (3, 1))
+        for shard in SHARDS:
+            with self.subTest(shard=shard):
+                self.assertFalse(
+                    Post.all_objects.using(shard)
+                    .filter(author=self.second.pk).exists()
+                )
+                self.assertFalse(Comment.objects.using(shard).exists())
+                self.assertFalse(
+                    User.objects.using(shard).filter(username='second')
+                    .exists()
+                )
+        self.assertFalse(User.objects.filter(username='second').exists())
+
+    def test_media_gc_sees_images_on_shards(self):
+        post = self.posts[1]
+        Post.objects.using(shard_for_post(post.pk)).filter(
+            pk=post.pk
+        ).update(image='posts/shard.gif')
+        with tempfile.TemporaryDirectory() as directory:
+            collector = MediaCollector(directory)
+            collector.collect_live_images()
+            self.assertTrue(collector.is_live('posts/shard.gif'))
+            collector.close()
+
+    def test_edit_sharded_post_twice(self):
+        """Версии поста с шарда нумеруются по порядку в default."""
+        post = self.posts[1]
+        client = Client()
+        client.force_login(self.second)
+        for text in ('Первая правка', 'Вторая правка'):
+            response = client.post(
+                reverse('posts:post_edit', args=[post.pk]), {'text': text}
+            )
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(
+                PostRevision.objects.filter(post_id=post.pk)
+                .order_by('number').values_list('number', flat=True)
+            ),
+            [1, 2, 3],
+        )
+
+    def test_trending_reads_every_shard(self):
+        now = timezone.now()
+        record_activity(self.posts[0].pk, now)
+        for _ in range(2):
+            record_activity(self.posts[1].pk, now)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Пост 1', 'Пост 0'],
+        )
+
+        for post in self.posts[:2]:
+            post.comments.create(author=self.reader, text='Комментарий')
+        self.assertEqual(rollup(full=True), (2, 0))
+        for shard in SHARDS:
+            self.assertEqual(TrendingScore.objects.using(shard).count(), 1)
+
+    def test_feed_and_notifications_read_every_shard(self):
+        response = self.client.get(reverse('posts:index_feed', args=['rss']))
+        for post in self.posts:
+            self.assertContains(response, post.text)
+
+        Notification.objects.create(
+            recipient=self.reader, actor=self.second,
+            kind=Notification.COMMENT, post_id=self.posts[1].pk,
+            updated=timezone.now(),
+        )
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:notifications'))
+        self.assertEqual(
+            response.context['page_obj'][0].post.text, 'Пост 1'
+        )
+
+    def test_digest_collects_posts_from_every_shard(self):
+        User.objects.filter(pk=self.reader.pk).update(
+            email='reader@example.com'
+        )
+        DigestSubscription.objects.create(user=self.reader)
+        for author in (self.first, self.second):
+            Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(send_digests()[:2], (1, 1))
+        for post in self.posts:
+            self.assertIn(post.text, mail.outbox[0].body)
+
+    def test_maintenance_commands_cover_every_shard(self):
+        post = self.posts[1]
+        Post.objects.using(shard_for_post(post.pk)).filter(
+            pk=post.pk
+        ).update(text='С #тегом')
+        self.assertEqual(reindex_tags(), 6)
+        self.assertEqual(
+            PostTag.objects.using(shard_for_post(post.pk)).count(), 1
+        )
+
+        with tempfile.TemporaryDirectory() as root:
+            build_sitemaps(root=root)
+            with open(os.path.join(root, shard_name('posts', 0))) as file:
+                sitemap = file.read()
+            with open(os.path.join(root, shard_name('profiles', 0))) as file:
+                profiles = file.read()
+        for post in self.posts:
+            self.assertIn(
+                reverse('posts:post_detail', args=[post.pk]), sitemap
+            )
+        for username in ('first', 'second'):
+            self.assertIn(
+                reverse('posts:profile', args=[username]), profiles
+            )
+
+        self.assertEqual(archive_old_posts(age=0), (6, 0))
+        self.assertEqual(ArchivedPost.objects.count(), 6)
+        for shard in SHARDS:
+            self.assertFalse(Post.all_objects.using(shard).exists())
@@ -0,0 +1,89 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from ..deletion import delete_post
+from ..models import Group, Post, User
+from ..sitemaps import build_sitemaps, shard_name
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    SITEMAP_ROOT=TEMP_SITEMAP_ROOT,
+    SITEMAP_SHARD_SIZE=2,
+    SITE_URL='https://yatube.test',
+)
+class SitemapTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            for i in range(5)
+        ]
+
+    def read(self, name):
+        with open(os.path.join(TEMP_SITEMAP_ROOT, name)) as sitemap:
+            return sitemap.read()
+
+    def shard_of(self, post):
+        return shard_name('posts', post.id // 2)
+
+    def mtime(self, name):
+        return os.stat(os.path.join(TEMP_SITEMAP_ROOT, name)).st_mtime_ns
+
+    def test_full_build_lists_posts_groups_and_profiles(self):
+        build_sitemaps()
+        index = self.read('sitemap.xml')
+        for post in self.posts:
+            self.assertIn(
+                f'https://yatube.test/posts/{post.id}/',
+                self.read(self.shard_of(post)),
+            )
+            self.assertIn(self.shard_of(post), index)
+        groups = self.read(shard_name('groups', self.group.id // 2))
+        self.assertIn('https://yatube.test/group/group/', groups)
+        self.assertIn('<lastmod>', groups)
+        profiles = self.read(shard_name('profiles', self.author.id // 2))
+        self.assertIn('https://yatube.test/profile/author/', profiles)
+        with gzip.open(
+            os.path.join(TEMP_SITEMAP_ROOT, 'sitemap.xml.gz'), 'rt'
+        ) as compressed:
+            self.assertEqual(compressed.read(), index)
+
+    def test_incremental_build_rewrites_only_touched_shards(self):
+        """Повторный прогон трогает только шарды изменённых постов."""
+        build_sitemaps()
+        first, last = self.posts[0], self.posts[-1]
+        untouched = self.mtime(self.shard_of(first))
+
+        delete_post(last)
+        new_post = Post.objects.create(text='Новый', author=self.author)
+        rewritten = build_sitemaps()
+
+        self.assertEqual(self.mtime(self.shard_of(first)), untouched)
+        self.assertNotIn(
+            f'/posts/{last.id}/',
+            self.read(self.shard_of(last)),
+        )
+        self.assertIn(
+            f'/posts/{new_post.id}/', self.read(self.shard_of(new_post))
+        )
+        # Шарды постов (1 или 2), группы и профиля автора.
+        self.assertLessEqual(rewritten, 4)
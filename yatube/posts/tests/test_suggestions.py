@@ -0,0 +1,112 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..suggestions import graph
+
+
+class SuggestionsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.other_friend = User.objects.create_user(username='other_friend')
+        cls.popular = User.objects.create_user(username='popular')
+        cls.niche = User.objects.create_user(username='niche')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug-test',
+            description='Описание группы'
+        )
+        Post.objects.create(text='Пост', author=cls.user, group=cls.group)
+        Post.objects.create(text='Пост', author=cls.niche, group=cls.group)
+        for follower, author in (
+            (cls.user, cls.friend),
+            (cls.user, cls.other_friend),
+            (cls.friend, cls.popular),
+            (cls.other_friend, cls.popular),
+            (cls.friend, cls.niche),
+        ):
+            Follow.objects.create(user=follower, author=author)
+
+    def setUp(self):
+        graph.build()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_ranking_by_co_follows_and_groups(self):
+        """Подсказки ранжируются по общим подпискам и группам."""
+        self.assertEqual(
+            graph.suggest(self.user.id),
+            [self.popular.id, self.niche.id]
+        )
+
+    def test_follow_and_unfollow_patch_index(self):
+        """Подписка и отписка сразу меняют индекс."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'popular'})
+        )
+        self.assertEqual(graph.suggest(self.user.id), [self.niche.id])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'popular'})
+        )
+        self.assertEqual(
+            graph.suggest(self.user.id),
+            [self.popular.id, self.niche.id]
+        )
+
+    def test_pages_show_suggestions(self):
+        """Подсказки есть на странице подписок и в профиле."""
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', kwargs={'username': 'friend'}),
+        ):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(
+                    response.context['suggestions'],
+                    [self.popular, self.niche]
+                )
+
+    def test_any_edge_change_resets_memo(self):
+        """Отписка друга меняет подсказки и у его подписчиков."""
+        graph.suggest(self.user.id)
+        graph.remove_edge(self.other_friend.id, self.popular.id)
+        self.assertEqual(
+            graph.suggest(self.user.id), [self.niche.id, self.popular.id]
+        )
+
+    @override_settings(SUGGESTIONS_CACHE_SIZE=1)
+    def test_memo_is_bounded(self):
+        graph.suggest(self.user.id)
+        graph.suggest(self.friend.id)
+        self.assertEqual(list(graph.suggestions), [self.friend.id])
+
+    def test_edges_changed_during_rebuild_are_kept(self):
+        """Правка, пришедшая во время перестройки, не теряется."""
+        def aliases():
+            graph.add_edge(self.user.id, self.popular.id)
+            return ['default']
+
+        with mock.patch('posts.suggestions.shard_aliases', aliases):
+            graph.build()
+        self.assertEqual(graph.suggest(self.user.id), [self.niche.id])
+
+    @override_settings(SUGGESTIONS_REBUILD_IN_BACKGROUND=True)
+    def test_stale_index_is_rebuilt_in_background(self):
+        graph.built_at = None
+        self.addCleanup(graph.build)
+        with mock.patch.object(graph, 'build') as build:
+            graph.ensure_fresh()
+            for thread in threading.enumerate():
+                if thread.name == 'suggestions-rebuild':
+                    thread.join()
+        build.assert_called_once_with()
+        self.assertFalse(graph.rebuilding)
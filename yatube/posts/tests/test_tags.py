@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, PostTag, User
+from ..tags import extract_hashtags, extract_mentions, linkify
+
+
+class ExtractionTests(TestCase):
+
+    def test_hashtags_and_mentions(self):
+        text = 'Пишу про #Django и #питон, @leo. Почта: a@b.ru, &#39;#1'
+        self.assertEqual(extract_hashtags(text), {'django', 'питон', '1'})
+        self.assertEqual(extract_mentions(text), {'leo'})
+
+    def test_linkify_escapes_and_links_known_users(self):
+        html = linkify('<b>#тег</b> @leo @ghost\nдалее', {'leo'})
+        self.assertIn('&lt;b&gt;', html)
+        tag_url = reverse('posts:tag', args=['тег'])
+        self.assertIn(f'<a href="{tag_url}">#тег</a>', html)
+        self.assertIn('<a href="/profile/leo/">@leo</a>', html)
+        self.assertIn(' @ghost<br>', html)
+
+
+class TagViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_create_and_edit_sync_tags(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Про #кино и #книги'}
+        )
+        post = Post.objects.get()
+        self.assertEqual(
+            set(post.tags.values_list('name', flat=True)), {'кино', 'книги'}
+        )
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Только #Книги'},
+        )
+        self.assertEqual(
+            list(post.tags.values_list('name', flat=True)), ['книги']
+        )
+        response = self.client.get(reverse('posts:tag', args=['книги']))
+        self.assertContains(response, 'Только')
+        self.assertEqual(
+            self.client.get(reverse('posts:tag', args=['кино'])).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.get(reverse('posts:tag', args=['нет'])).status_code,
+            404,
+        )
+
+    def test_mentions_resolved_in_one_query(self):
+        for i in range(3):
+            Post.objects.create(
+                text=f'Привет, @reader и @ghost{i}', author=self.author
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, '<a href="/profile/reader/">@reader</a>', count=3
+        )
+        self.assertNotContains(response, '/profile/ghost0/')
+        self.assertEqual(
+            sum('"username" IN' in query['sql'] for query in queries),
+            1,
+        )
+
+    def test_command_reextracts_tags(self):
+        Post.objects.create(text='#один #два', author=self.author)
+        Post.objects.create(text='#два', author=self.author)
+        PostTag.objects.all().delete()
+        call_command('extract_tags', chunk_size=1, stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 3)
+        self.assertEqual(
+            self.client.get(reverse('posts:tag', args=['два'])).status_code,
+            200,
+        )
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingScore, User
+from ..trending import activity_weight, log_add, record_activity, rollup
+
+
+class TrendingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.quiet_post = Post.objects.create(
+            text='Тихий пост',
+            author=cls.user,
+        )
+        cls.old_post = Post.objects.create(
+            text='Старое обсуждение',
+            author=cls.user,
+        )
+        cls.hot_post = Post.objects.create(
+            text='Горячее обсуждение',
+            author=cls.user,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_log_add(self):
+        """log_add складывает веса в логарифмах без переполнения."""
+        self.assertAlmostEqual(log_add(0, 0), 0.6931, places=4)
+        self.assertAlmostEqual(log_add(5000, 1), 5000)
+
+    def test_recent_activity_outranks_older_activity(self):
+        """Свежий комментарий весит больше нескольких старых."""
+        now = timezone.now()
+        for _ in range(3):
+            record_activity(self.old_post.id, now - timedelta(days=1))
+        record_activity(self.hot_post.id, now)
+        response = self.authorized_client.get(reverse('posts:trending'))
+        posts = list(response.context['page_obj'])
+        self.assertEqual(posts, [self.hot_post, self.old_post])
+        self.assertTrue(response.context['trending'])
+
+    def test_add_comment_updates_score(self):
+        """Комментарий сразу попадает в рейтинг."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.hot_post.id}),
+            {'text': 'Комментарий'},
+        )
+        comment = Comment.objects.get()
+        self.assertAlmostEqual(
+            TrendingScore.objects.get(post=self.hot_post).score,
+            activity_weight(comment.created)
+        )
+
+    def test_trending_feed_does_not_aggregate_comments(self):
+        """Лента популярного не агрегирует комментарии на запросе."""
+        record_activity(self.hot_post.id, timezone.now())
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(reverse('posts:trending'))
+        for query in queries.captured_queries:
+            self.assertNotIn('posts_comment', query['sql'])
+            self.assertNotIn('GROUP BY', query['sql'])
+
+    def test_rollup_rebuilds_and_prunes(self):
+        """Пересчёт восстанавливает рейтинг и убирает устаревшие посты."""
+        Comment.objects.create(
+            post=self.hot_post, author=self.user, text='Комментарий'
+        )
+        TrendingScore.objects.create(
+            post=self.old_post,
+            score=0,
+            updated=timezone.now() - timedelta(days=30),
+        )
+        self.assertEqual(rollup(full=True), (1, 1))
+        self.assertEqual(
+            list(TrendingScore.objects.values_list('post', flat=True)),
+            [self.hot_post.id]
+        )
+        call_command('rollup_trending', verbosity=0)
@@ -0,0 +1,103 @@
+import heapq
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, Post, TrendingScore
+from .sharding import shard_aliases, shard_for_post
+
+
+def activity_weight(when):
+    """Логарифм веса события: чем позже событие, тем он больше."""
+    return when.timestamp() * math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) без переполнения."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def record_activity(post_id, when):
+    """Учитывает новое событие (комментарий) в рейтинге поста."""
+    weight = activity_weight(when)
+    shard = shard_for_post(post_id)
+    scores = TrendingScore.objects.using(shard).select_for_update()
+    with transaction.atomic(using=shard):
+        score, created = scores.get_or_create(
+            post_id=post_id,
+            defaults={'score': weight, 'updated': when},
+        )
+        if not created:
+            score.score = log_add(score.score, weight)
+            score.updated = max(score.updated, when)
+            score.save(update_fields=('score', 'updated'))
+
+
+def top_posts(limit):
+    """``limit`` постов с наибольшим рейтингом со всех шардов."""
+    rows = (
+        Post.objects.using(alias).filter(trending__isnull=False)
+        .select_related('author', 'group', 'trending')
+        .order_by('-trending__score')[:limit]
+        for alias in shard_aliases()
+    )
+    return heapq.nlargest(
+        limit,
+        (post for posts in rows for post in posts),
+        key=lambda post: post.trending.score,
+    )
+
+
+def rollup(full=False, chunk_size=2000):
+    """Обслуживание таблицы рейтинга на каждом шарде.
+
+    Удаляет посты без активности дольше ``TRENDING_WINDOW``. С ``full``
+    пересчитывает рейтинг заново из комментариев за окно — одним
+    проходом по индексу ``created``, без GROUP BY.
+    Возвращает (пересчитано, удалено).
+    """
+    since = timezone.now() - timedelta(seconds=settings.TRENDING_WINDOW)
+    recounted = deleted = 0
+    for alias in shard_aliases():
+        alias_recounted, alias_deleted = rollup_shard(
+            alias, since, full, chunk_size
+        )
+        recounted += alias_recounted
+        deleted += alias_deleted
+    return recounted, deleted
+
+
+def rollup_shard(alias, since, full, chunk_size):
+    table = TrendingScore.objects.using(alias)
+    deleted, _ = table.filter(updated__lt=since).delete()
+    if not full:
+        return 0, deleted
+
+    comments = (
+        Comment.objects.using(alias).filter(created__gte=since)
+        .values_list('post_id', 'created')
+        .iterator(chunk_size=chunk_size)
+    )
+    scores = {}
+    for post_id, created in comments:
+        weight = activity_weight(created)
+        score = scores.get(post_id)
+        scores[post_id] = (
+            (weight, created) if score is None
+            else (log_add(score[0], weight), created)
+        )
+
+    with transaction.atomic(using=alias):
+        table.all().delete()
+        table.bulk_create(
+            (
+                TrendingScore(post_id=post_id, score=score, updated=updated)
+                for post_id, (score, updated) in scores.items()
+            ),
+            batch_size=chunk_size,
+        )
+    return len(scores), deleted
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.paginator import Paginator
 
 
@@ -6,3 +7,23 @@ def includes_paginator(request, post_list, limit):
     page_number = request.GET.get('page')
 
     return paginator.get_page(page_number)
+
+
+def cursor_paginator(request, queryset, limit, field='id'):
+    """Страница списка по курсору ``?after=<значение field>``.
+
+    Список идёт по убыванию ``field``; в отличие от OFFSET, глубина
+    страницы не влияет на стоимость запроса. Возвращает объекты
+    страницы и курсор следующей (или None).
+    """
+    cursor = request.GET.get('after', '')
+    if cursor.isdigit():
+        queryset = queryset.filter(**{f'{field}__lt': int(cursor)})
+    items = list(queryset.order_by(f'-{field}')[:limit + 1])
+    if len(items) <= limit:
+        return items, None
+    return items[:limit], getattr(items[limit - 1], field)
+
+
+def absolute_url(path):
+    return settings.SITE_URL.rstrip('/') + path
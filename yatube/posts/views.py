@@ -1,18 +1,42 @@
+from datetime import date
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.http import Http404
+from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import versioned_cache_page
+from core.ratelimit import ratelimit
 
+from .archive import archive_months, month_posts, move_post
+from .deletion import delete_post, release_image
+from .feeds import render_feed, touch_feeds
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User, Follow
-from .utils import includes_paginator
+from .models import (
+    ArchivedPost, DigestSubscription, Follow, Group, Post, PostRevision, Tag,
+    User, UserStats
+)
+from .notifications import attach_posts, mark_read
+from .partitions import ChainedPosts, get_post_or_404
+from .revisions import record_revision, revision_text
+from .sharding import (
+    across_shards, enabled as sharding_enabled, shard_for_author,
+    shard_for_post
+)
+from .suggestions import suggested_authors
+from .tags import sync_tags
+from .trending import record_activity, top_posts
+from .utils import cursor_paginator, includes_paginator
 
 PAGE_SIZE = settings.NUMBER_OF_POSTS_PER_PAGE
 
 
-@cache_page(20, key_prefix='index_page')
+@versioned_cache_page(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = across_shards(Post.objects.select_related('author', 'group'))
     page_obj = includes_paginator(request, post_list, PAGE_SIZE)
 
     context = {
@@ -21,9 +45,21 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@versioned_cache_page(20, key_prefix='trending_page')
+def trending(request):
+    post_list = top_posts(settings.TRENDING_SIZE)
+    page_obj = includes_paginator(request, post_list, PAGE_SIZE)
+
+    context = {
+        'page_obj': page_obj,
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
+    post_list = across_shards(group.posts.select_related('author'))
     page_obj = includes_paginator(request, post_list, PAGE_SIZE)
     context = {
         'group': group,
@@ -33,8 +69,15 @@ def group_posts(request, slug):
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+        is_active=True,
+    )
+    post_list = ChainedPosts(
+        author.posts.select_related('group'),
+        author.archived_posts.select_related('group'),
+    )
     page_obj = includes_paginator(request, post_list, PAGE_SIZE)
 
     user = request.user
@@ -46,16 +89,167 @@ def profile(request, username):
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'stats': UserStats.get_for(author),
+        'suggestions': suggested_authors(user),
     }
     return render(request, 'posts/profile.html', context)
 
 
-def post_detail(request, post_id):
-    post = get_object_or_404(
+def follow_list(request, username, relation):
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+        is_active=True,
+    )
+    if relation == 'followers':
+        follows = author.following.filter(
+            user__is_active=True
+        ).select_related('user')
+    else:
+        follows = author.follower.filter(
+            author__is_active=True
+        ).select_related('author')
+    follows, next_cursor = cursor_paginator(request, follows, PAGE_SIZE)
+    people = [
+        follow.user if relation == 'followers' else follow.author
+        for follow in follows
+    ]
+
+    followed_ids = set()
+    if request.user.is_authenticated and people:
+        followed_ids = set(
+            Follow.objects.filter(
+                user=request.user,
+                author__in=people,
+            ).values_list('author_id', flat=True)
+        )
+
+    context = {
+        'author': author,
+        'relation': relation,
+        'stats': UserStats.get_for(author),
+        'people': [
+            (person, person.pk in followed_ids) for person in people
+        ],
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def followers(request, username):
+    return follow_list(request, username, 'followers')
+
+
+def following(request, username):
+    return follow_list(request, username, 'following')
+
+
+def index_feed(request, feed_format):
+    return render_feed(
+        request, 'index', feed_format,
+        title='Yatube',
+        link=reverse('posts:index'),
+        description='Последние обновления на сайте',
+        get_posts=lambda: across_shards(
+            Post.objects.select_related('author', 'group')
+        ),
+    )
+
+
+def group_feed(request, slug, feed_format):
+    group = get_object_or_404(Group, slug=slug)
+    return render_feed(
+        request, f'group:{group.pk}', feed_format,
+        title=group.title,
+        link=reverse('posts:group_list', args=[slug]),
+        description=group.description,
+        get_posts=lambda: across_shards(
+            group.posts.select_related('author', 'group')
+        ),
+    )
+
+
+def profile_feed(request, username, feed_format):
+    author = get_object_or_404(User, username=username, is_active=True)
+    return render_feed(
+        request, f'author:{author.pk}', feed_format,
+        title=f'Посты пользователя {author.get_full_name() or username}',
+        link=reverse('posts:profile', args=[username]),
+        description='',
+        get_posts=lambda: author.posts.select_related('author', 'group'),
+    )
+
+
+def render_archive(request, feed, post_list, archived_list, year, month,
+                   extra_context):
+    if not (1 <= month <= 12 and 1 < year < 9999):
+        raise Http404
+    page_obj = includes_paginator(
+        request,
+        ChainedPosts(
+            across_shards(month_posts(post_list, year, month)),
+            month_posts(archived_list, year, month),
+        ),
+        PAGE_SIZE,
+    )
+    context = {
+        'page_obj': page_obj,
+        'month': date(year, month, 1),
+        'years': archive_months(feed),
+        **extra_context,
+    }
+    return render(request, 'posts/archive.html', context)
+
+
+def archive(request, year, month):
+    return render_archive(
+        request, 'index',
         Post.objects.select_related('author', 'group'),
-        id=post_id
+        ArchivedPost.objects.select_related('author', 'group'),
+        year, month, {},
+    )
+
+
+def group_archive(request, slug, year, month):
+    group = get_object_or_404(Group, slug=slug)
+    return render_archive(
+        request, f'group:{group.pk}',
+        group.posts.select_related('author'),
+        group.archived_posts.select_related('author'),
+        year, month, {'group': group},
     )
-    comments = post.comments.select_related('author')
+
+
+def profile_archive(request, username, year, month):
+    author = get_object_or_404(User, username=username, is_active=True)
+    return render_archive(
+        request, f'author:{author.pk}',
+        author.posts.select_related('group'),
+        author.archived_posts.select_related('group'),
+        year, month, {'author': author},
+    )
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    post_list = across_shards(
+        Post.objects.filter(post_tags__tag=tag)
+        .select_related('author', 'group')
+        .order_by('-post_tags__pub_date')
+    )
+    page_obj = includes_paginator(request, post_list, PAGE_SIZE)
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/tag.html', context)
+
+
+def post_detail(request, post_id):
+    post = get_post_or_404(post_id)
+    comments = post.comments.filter(
+        author__is_active=True
+    ).select_related('author')
     form = CommentForm()
     context = {
         'post': post,
@@ -66,6 +260,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@ratelimit('post_create', methods=('POST',))
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -73,16 +268,22 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author = request.user
     new_post.save()
+    sync_tags(new_post)
     return redirect(f'/profile/{request.user.username}/')
 
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.using(shard_for_post(post_id)), id=post_id
+    )
 
     if post.author != request.user:
         return redirect(f'/posts/{post_id}/')
 
+    old_image = post.image.name
+    old_group_id = post.group_id
+    old_text, old_updated = post.text, post.updated
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
@@ -94,37 +295,111 @@ def post_edit(request, post_id):
         return render(request, 'posts/create_post.html', context)
 
     post.save()
+    record_revision(post, old_text, old_updated)
+    sync_tags(post)
+    if post.image.name != old_image:
+        release_image(old_image)
+    if post.group_id != old_group_id:
+        move_post(post, old_group_id)
+        if old_group_id:
+            touch_feeds(f'group:{old_group_id}')
     return redirect(f'/posts/{post_id}/')
 
 
 @login_required
+def post_history(request, post_id):
+    post = get_post_or_404(post_id)
+    if post.author != request.user and not request.user.is_staff:
+        raise Http404
+    revisions = PostRevision.objects.filter(post_id=post.pk).values_list(
+        'number', 'created'
+    )
+    version = request.GET.get('version', '')
+    text = None
+    if version.isdigit():
+        text = revision_text(post, int(version))
+        if text is None:
+            raise Http404
+    context = {
+        'post': post,
+        'revisions': revisions,
+        'version': int(version) if text is not None else None,
+        'text': text,
+    }
+    return render(request, 'posts/post_history.html', context)
+
+
+@login_required
+@require_POST
+def post_delete(request, post_id):
+    post = get_object_or_404(
+        Post.objects.using(shard_for_post(post_id)),
+        id=post_id,
+        author=request.user,
+    )
+    delete_post(post)
+    return redirect('posts:profile', username=request.user.username)
+
+
+@login_required
+@ratelimit('add_comment', methods=('POST',))
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.using(shard_for_post(post_id)), id=post_id
+    )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        record_activity(post.id, comment.created)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
     user = request.user
-    posts_list = Post.objects.filter(author__following__user=user)
+    if sharding_enabled():
+        # Подписки лежат в default, посты — на шардах авторов.
+        authors = list(user.follower.values_list('author_id', flat=True))
+        posts_list = across_shards(
+            Post.objects.filter(author_id__in=authors),
+            aliases={shard_for_author(author) for author in authors},
+        )
+    else:
+        posts_list = Post.objects.filter(author__following__user=user)
 
     page_obj = includes_paginator(request, posts_list, PAGE_SIZE)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'suggestions': suggested_authors(user),
+        'digest_enabled': DigestSubscription.objects.filter(
+            user=user
+        ).exists(),
     }
 
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+def digest_subscribe(request):
+    DigestSubscription.objects.get_or_create(user=request.user)
+    return redirect('posts:follow_index')
+
+
+@login_required
+def digest_unsubscribe(request):
+    DigestSubscription.objects.filter(user=request.user).delete()
+    return redirect('posts:follow_index')
+
+
+@login_required
+@ratelimit('follow')
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User, username=username, is_active=True
+    )
     user = request.user
     if author != user:
         Follow.objects.get_or_create(user=user, author=author)
@@ -135,11 +410,28 @@ def profile_follow(request, username):
 
 
 @login_required
+@ratelimit('follow')
 def profile_unfollow(request, username):
     user = request.user
-    author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=user, author=author).delete()
+    author = get_object_or_404(
+        User, username=username, is_active=True
+    )
+    Follow.objects.filter(user=user, author=author).delete()
     return redirect(
         'posts:profile',
         username=username
     )
+
+
+@login_required
+def notifications(request):
+    seen_at = timezone.now()
+    notification_list = request.user.notifications.select_related('actor')
+    page_obj = includes_paginator(request, notification_list, PAGE_SIZE)
+    attach_posts(page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    response = render(request, 'posts/notifications.html', context)
+    mark_read(request.user, page_obj, seen_at)
+    return response
@@ -16,6 +16,7 @@ app_name = 'users'
 
 urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
+    path('delete/', views.account_delete, name='account_delete'),
     path(
         'logout/',
         LogoutView.as_view(template_name='users/logged_out.html'),
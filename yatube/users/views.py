@@ -1,6 +1,11 @@
+from django.contrib.auth import logout
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
 
+from posts.deletion import delete_account
+
 from .forms import CreationForm
 
 
@@ -8,3 +13,12 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('users:login')
     template_name = 'users/signup.html'
+
+
+@login_required
+def account_delete(request):
+    if request.method != 'POST':
+        return render(request, 'users/account_delete.html')
+    delete_account(request.user)
+    logout(request)
+    return redirect('posts:index')
@@ -33,7 +33,9 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
-    'django.contrib.admin',
+    # Без автопоиска admin.py: модули админки импортируются в urls.py,
+    # а не в каждой management-команде.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -43,7 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,12 +61,19 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -70,12 +81,16 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.notifications',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Прогревать шаблоны, URL, sorl-thumbnail и БД при загрузке wsgi.py.
+WARMUP_ON_STARTUP = True
+WARMUP_IN_BACKGROUND = True
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -84,9 +99,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Файлы для шардирования постов, используются только из POST_SHARDS.
+    'shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'shard_1.sqlite3'),
+    },
+    'shard_2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'shard_2.sqlite3'),
+    },
 }
 
+DATABASE_ROUTERS = ['posts.sharding.AuthorShardRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -122,13 +148,36 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+# Файлы меньше этого размера не сжимаются при collectstatic.
+STATIC_COMPRESS_MIN_SIZE = 256
+# Раздавать STATIC_ROOT из WSGI-процесса, если нет фронт-прокси.
+SERVE_STATIC = False
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь в базе; отправляет их send_queued_mail
+# через OUTBOX_DELIVERY_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_DELAY = 60
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+# Через сколько секунд письма упавшего воркера снова уходят в очередь.
+OUTBOX_LEASE_TIMEOUT = 10 * 60
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Адрес сайта для ссылок в письмах.
+SITE_URL = 'http://127.0.0.1:8000'
+
+# Готовые sitemap.xml и его шарды (не больше 50 000 URL на файл).
+# Фронт-прокси отдаёт /sitemap*.xml прямо из этого каталога.
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_SHARD_SIZE = 10000
+DIGEST_MAX_POSTS = 20
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -141,9 +190,110 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# python | x-accel | x-sendfile
+MEDIA_SERVE_MODE = 'python'
+# internal location в nginx, смотрящий в MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_CONTROL = 'public, max-age=86400'
+# Для файлов под правилом доступа: общий кэш их не хранит.
+MEDIA_PRIVATE_CACHE_CONTROL = 'private, no-cache'
+# Проверки доступа к файлам MEDIA_ROOT: {префикс пути: функция
+# (request, name) -> bool}. Картинки постов скрываются вместе с постом.
+# У миниатюр sorl (cache/) правила нет: по имени-хэшу исходную картинку
+# не найти, поэтому при скрытии поста они удаляются (hide_thumbnails).
+MEDIA_ACCESS_RULES = {'posts/': 'posts.deletion.image_visible'}
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Сжатые тела ответов: отдельно, чтобы не вытеснять сессии и лимиты.
+    'compression': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compression',
+    },
+}
+
+RATELIMIT_ENABLE = True
+RATELIMIT_CACHE = 'default'
+RATELIMITS = {
+    'post_create': '10/m',
+    'add_comment': '20/m',
+    'follow': '30/m',
 }
+
+SESSION_ENGINE = 'core.sessions'
+SESSION_CACHE_ALIAS = 'default'
+# Как часто изменения сессии доходят до базы. Работает только с общим
+# для воркеров кэшем; с LocMemCache каждое сохранение пишется в базу.
+SESSION_WRITE_BEHIND_INTERVAL = 60
+
+AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 5 * 60
+
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_LEVELS = {'br': 5, 'gzip': 6}
+COMPRESSION_MINIFY_HTML = True
+# Сколько держать в кэше уже сжатые тела ответов; 0 — не кэшировать.
+COMPRESSION_CACHE_TIMEOUT = 60
+COMPRESSION_CACHE = 'compression'
+
+# Популярное: период полураспада веса комментария, окно и размер топа.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 7 * 24 * 60 * 60
+TRENDING_SIZE = 100
+
+# «На кого подписаться»: размер списка, период полной перестройки индекса
+# (в фоновом потоке или прямо в запросе), предел обхода рёбер графа
+# подписок на один запрос и для скольких пользователей помнить подсказки.
+SUGGESTIONS_LIMIT = 5
+SUGGESTIONS_REBUILD_INTERVAL = 10 * 60
+SUGGESTIONS_REBUILD_IN_BACKGROUND = True
+SUGGESTIONS_MAX_EXPANSION = 5000
+SUGGESTIONS_CACHE_SIZE = 10000
+
+# События одного типа по одному посту в пределах окна сворачиваются.
+NOTIFICATION_COLLAPSE_WINDOW = 10 * 60
+NOTIFICATION_BADGE_TIMEOUT = 5 * 60
+
+# Сколько строк фоновая очистка удалённого удаляет в одной транзакции.
+PURGE_CHUNK_SIZE = 500
+
+# Сборка мусора в MEDIA_ROOT: файлы моложе MEDIA_GC_GRACE секунд не
+# трогаются, удаляется не больше MEDIA_GC_RATE файлов в секунду.
+MEDIA_GC_GRACE = 60 * 60
+MEDIA_GC_RATE = 20
+
+# RSS/Atom: число постов в ленте и срок жизни готового XML (он и так
+# перестаёт читаться после записи в ленту). Штамп версии ленты живёт
+# FEED_STAMP_TIMEOUT секунд и затем перечитывается из БД: так запись
+# через другой воркер со своим кэшем доходит и до его читателей.
+FEED_SIZE = 20
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+FEED_STAMP_TIMEOUT = 60
+
+# Сколько постов команда extract_tags обрабатывает за одну транзакцию.
+TAGS_CHUNK_SIZE = 1000
+
+# История правок: полный снимок текста через каждые N версий, между
+# снимками хранятся дельты к предыдущей версии.
+REVISION_SNAPSHOT_INTERVAL = 10
+
+# Посты старше этого срока (в секундах) команда archive_posts переносит
+# из горячей таблицы в архивную, пачками по POST_ARCHIVE_CHUNK_SIZE.
+POST_ARCHIVE_AGE = 365 * 24 * 60 * 60
+POST_ARCHIVE_CHUNK_SIZE = 500
+
+# Шардирование постов по авторам: алиасы баз из DATABASES (пусто —
+# выключено) и явное размещение отдельных авторов {id автора: алиас}.
+POST_SHARDS = []
+POST_SHARD_MAP = {}
+
+# Профилирование запросов: доля случайно профилируемых запросов, период
+# снятия стеков (с), срок жизни токена со страницы профилей (с), каталог
+# хранилища и сколько последних профилей в нём держать.
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_INTERVAL = 0.005
+PROFILE_TOKEN_AGE = 60 * 60
+PROFILE_ROOT = os.path.join(BASE_DIR, 'profiles')
+PROFILE_MAX_COUNT = 200
@@ -14,9 +14,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.media import serve_media
+from core.views import profile_download, profile_list, readiness
+
+admin.autodiscover()
 
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.forbidden'
@@ -27,9 +31,16 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('health/ready/', readiness, name='readiness'),
+    path('profiles/', profile_list, name='profile_list'),
+    path(
+        'profiles/<str:name>.<str:fmt>',
+        profile_download,
+        name='profile_download'
+    ),
+    re_path(
+        r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+        serve_media,
+        name='media'
+    ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
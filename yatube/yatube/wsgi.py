@@ -9,8 +9,25 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.WARMUP_ON_STARTUP:
+    from core.warmup import start_warm_up
+
+    start_warm_up(background=settings.WARMUP_IN_BACKGROUND)
+
+if settings.SERVE_STATIC:
+    from core.static import StaticFilesApp
+
+    application = StaticFilesApp(application)
+    application = StaticFilesApp(
+        application,
+        root=settings.SITEMAP_ROOT,
+        prefix='/sitemap',
+        strip_prefix=False,
+    )